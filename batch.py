@@ -0,0 +1,522 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026     File: batch.py |
+# +-----------------------------------------------------+
+
+from flags import C, Z, I, D, B, U, V, N, NOT_NZ, NOT_NZC, NOT_NVZ, NOT_NVZC, NZ, ADC, ADC_BCD, SBC_BCD, CMP
+from opcodes import OPCODES, BRANCH_TAKEN_CYCLES, BRANCH_PAGE_CYCLES
+from opcodes import IMPLIED, ACCUMULATOR, IMMEDIATE, ZERO_PAGE, ZERO_PAGE_X, ZERO_PAGE_Y, RELATIVE
+from opcodes import ABSOLUTE, ABSOLUTE_X, ABSOLUTE_Y, INDIRECT, INDIRECT_X, INDIRECT_Y
+from compiler import BRANCHES
+import loader
+import numpy as np
+
+# Flag lookup tables as arrays, so a whole group of machines is looked up at once
+NZ_TABLE = np.frombuffer(NZ, dtype=np.uint8).astype(np.int32)
+ADC_TABLE = np.array(ADC, dtype=np.int32)
+ADC_BCD_TABLE = np.array(ADC_BCD, dtype=np.int32)
+SBC_BCD_TABLE = np.array(SBC_BCD, dtype=np.int32)
+CMP_TABLE = np.frombuffer(CMP, dtype=np.uint8).astype(np.int32)
+
+# Bit each flag instruction changes, and what it's set to
+FLAG_OPS = {
+    "CLC": (C, 0), "SEC": (C, C),
+    "CLI": (I, 0), "SEI": (I, I),
+    "CLD": (D, 0), "SED": (D, D),
+    "CLV": (V, 0),
+}
+
+
+class BatchCPU:
+    """
+        Runs <count> independent 6502 machines in lockstep, with their memory and registers held in NumPy arrays.
+
+        Every step fetches the next opcode of all running machines, groups the machines by opcode
+        and executes each group as array operations, so the Python overhead is paid per opcode
+        in flight instead of per machine.
+
+        Each machine has its own random byte at $FE, seeded from <seeds>, and its own key at $FF,
+        taken from <keys>. Machines stop at BRK.
+    """
+
+    def __init__(self, count, seeds=None, keys=0x64, address_space=0x10000):
+
+        self.count = count
+        self.address_space = address_space
+
+        self.memory = np.zeros((count, address_space), dtype=np.uint8)
+
+        # - Registers -
+        self.AX = np.zeros(count, dtype=np.int32)
+        self.X = np.zeros(count, dtype=np.int32)
+        self.Y = np.zeros(count, dtype=np.int32)
+        self.SP = np.full(count, 0x01FF, dtype=np.int32)
+        self.PC = np.zeros(count, dtype=np.int32)
+        self.flags = np.full(count, U, dtype=np.int32)
+
+        # - Counters -
+        self.cycles = np.zeros(count, dtype=np.int64)
+        self.instructions = np.zeros(count, dtype=np.int64)
+        self.halted = np.zeros(count, dtype=bool)
+
+        # - I/O -
+        if seeds is None:
+            seeds = np.arange(1, count + 1)
+        self.seeds = np.broadcast_to(np.asarray(seeds, dtype=np.uint32), (count,)).copy()
+        self.keys = np.broadcast_to(np.asarray(keys, dtype=np.uint8), (count,)).copy()
+        self.random_state = np.zeros(count, dtype=np.uint32)    # Seeded by reset()
+        self.random_addr = 0xFE
+        self.key_addr = 0xFF
+
+        self.operations = {}
+        for info in OPCODES:
+            if info is not None:
+                self.operations[info.mnemonic] = getattr(self, "op_" + info.mnemonic.lower())
+
+        # Seeds the generators and latches the keys the same way a later reset does
+        self.reset()
+
+    def __repr__(self):
+        return "<BatchCPU {} machines, {} running>".format(self.count, self.count - int(self.halted.sum()))
+
+    def load(self, addr, data):
+        """ Copies <data> into the memory of every machine starting from <addr> """
+
+        if addr + len(data) > self.address_space:
+            raise IndexError("Image doesn't fit in memory")
+
+        self.memory[:, addr:addr + len(data)] = np.frombuffer(data, dtype=np.uint8)
+
+    def load_rom(self, path, addr=0x0600, format=None):
+        """ Loads the program image at <path> into every machine, raw images starting from <addr>, and returns its entry point """
+
+        return loader.load(self, path, addr, format).entry
+
+    def reset(self, pc=0x0600):
+        """ Puts every machine back at <pc> with cleared registers, memory is kept """
+
+        self.AX[:] = 0
+        self.X[:] = 0
+        self.Y[:] = 0
+        self.SP[:] = 0x01FF
+        self.PC[:] = pc
+        self.flags[:] = U
+
+        self.cycles[:] = 0
+        self.instructions[:] = 0
+        self.halted[:] = False
+
+        self.random_state[:] = np.where(self.seeds == 0, 1, self.seeds)
+        self.memory[:, self.key_addr] = self.keys
+
+    def state(self, machine):
+        """ Returns the registers of <machine> as (AX, X, Y, flags, SP, PC, cycles) """
+
+        return tuple(int(reg[machine]) for reg in (self.AX, self.X, self.Y, self.flags,
+                                                   self.SP, self.PC, self.cycles))
+
+    """
+
+        -- Execution --
+
+    """
+
+    def step(self, live=None):
+        """ Executes one instruction on every running machine, or those selected by the mask <live>, and returns how many ran """
+
+        running = ~self.halted if live is None else live & ~self.halted
+        machines = np.flatnonzero(running)
+        if not machines.size:
+            return 0
+
+        opcodes = self.memory[machines, self.PC[machines]]
+
+        # Sort machines by opcode, then run each opcode once for its whole group
+        order = np.argsort(opcodes, kind="stable")
+        opcodes = opcodes[order]
+        machines = machines[order]
+
+        bounds = np.flatnonzero(opcodes[1:] != opcodes[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [machines.size]))
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self.execute(int(opcodes[start]), machines[start:end])
+
+        self.instructions[machines] += 1
+
+        return machines.size
+
+    def run(self, cycles=None, instructions=None):
+        """ Steps until every machine hit BRK, or ran past <cycles> cycles or <instructions> instructions, returns the step count """
+
+        steps = 0
+
+        while True:
+            live = ~self.halted
+            if cycles is not None:
+                live &= self.cycles < cycles
+            if instructions is not None:
+                live &= self.instructions < instructions
+
+            if not self.step(live):
+                return steps
+
+            steps += 1
+
+    def execute(self, opcode, idx):
+        """ Executes <opcode> on the machines listed in <idx> """
+
+        info = OPCODES[opcode]
+        pc = self.PC[idx]
+
+        # Undocumented opcodes are skipped as single byte NOPs
+        if info is None:
+            self.PC[idx] = (pc + 1) & 0xFFFF
+            self.cycles[idx] += 2
+            return
+
+        addr, crossed = self.address(info.mode, idx, pc)
+
+        self.cycles[idx] += info.cycles
+        if info.penalty:
+            self.cycles[idx] += crossed
+
+        self.PC[idx] = (pc + info.length) & 0xFFFF
+        self.operations[info.mnemonic](idx, addr, info)
+
+    """
+
+        -- Memory --
+
+    """
+
+    def read(self, idx, addr):
+        """ Returns the bytes at <addr> of the machines in <idx>, handing out random bytes at $FE """
+
+        val = self.memory[idx, addr].astype(np.int32)
+
+        hit = addr == self.random_addr
+        if hit.any():
+            machines = idx[hit]
+            val[hit] = self.random(machines)
+            self.memory[machines, self.random_addr] = val[hit]
+
+        return val
+
+    def write(self, idx, addr, val):
+        """ Writes <val> at <addr> of the machines in <idx> """
+
+        self.memory[idx, addr] = val
+
+    def random(self, idx):
+        """ Advances the xorshift generators of the machines in <idx> and returns a byte from each """
+
+        x = self.random_state[idx]
+        x ^= x << np.uint32(13)
+        x ^= x >> np.uint32(17)
+        x ^= x << np.uint32(5)
+        self.random_state[idx] = x
+
+        return (x & 0xFF).astype(np.int32)
+
+    def push(self, idx, val):
+        self.memory[idx, self.SP[idx]] = val
+        self.SP[idx] = 0x0100 | (self.SP[idx] - 1) & 0xFF
+
+    def pull(self, idx):
+        self.SP[idx] = 0x0100 | (self.SP[idx] + 1) & 0xFF
+        return self.memory[idx, self.SP[idx]].astype(np.int32)
+
+    """
+
+        -- Addressing Modes --
+
+    """
+
+    def address(self, mode, idx, pc):
+        """ Returns the effective addresses for <mode> and whether indexing crossed a page """
+
+        if mode == IMPLIED or mode == ACCUMULATOR:
+            return None, 0
+        if mode == IMMEDIATE or mode == RELATIVE:
+            return (pc + 1) & 0xFFFF, 0
+
+        lo = self.memory[idx, (pc + 1) & 0xFFFF].astype(np.int32)
+
+        if mode == ZERO_PAGE:
+            return lo, 0
+        if mode == ZERO_PAGE_X:
+            return (lo + self.X[idx]) & 0xFF, 0
+        if mode == ZERO_PAGE_Y:
+            return (lo + self.Y[idx]) & 0xFF, 0
+        if mode == INDIRECT_X:
+            ptr = (lo + self.X[idx]) & 0xFF
+            return self.read(idx, ptr) | self.read(idx, (ptr + 1) & 0xFF) << 8, 0
+        if mode == INDIRECT_Y:
+            base = self.read(idx, lo) | self.read(idx, (lo + 1) & 0xFF) << 8
+            addr = (base + self.Y[idx]) & 0xFFFF
+            return addr, (base ^ addr) >> 8 != 0
+
+        operand = lo | self.memory[idx, (pc + 2) & 0xFFFF].astype(np.int32) << 8
+
+        if mode == ABSOLUTE:
+            return operand, 0
+        if mode == ABSOLUTE_X:
+            addr = (operand + self.X[idx]) & 0xFFFF
+            return addr, (operand ^ addr) >> 8 != 0
+        if mode == ABSOLUTE_Y:
+            addr = (operand + self.Y[idx]) & 0xFFFF
+            return addr, (operand ^ addr) >> 8 != 0
+        if mode == INDIRECT:
+            # The pointer's high byte is fetched without carrying into the next page
+            hi = (operand & 0xFF00) | (operand + 1) & 0xFF
+            return self.read(idx, operand) | self.read(idx, hi) << 8, 0
+
+        raise ValueError("Unknown addressing mode " + str(mode))
+
+    """
+
+        -- Instructions --
+
+    """
+
+    def set_nz(self, idx, val):
+        self.flags[idx] = self.flags[idx] & NOT_NZ | NZ_TABLE[val]
+
+    # - Loads, stores and transfers -
+
+    def op_lda(self, idx, addr, info):
+        self.AX[idx] = val = self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_ldx(self, idx, addr, info):
+        self.X[idx] = val = self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_ldy(self, idx, addr, info):
+        self.Y[idx] = val = self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_sta(self, idx, addr, info):
+        self.write(idx, addr, self.AX[idx])
+
+    def op_stx(self, idx, addr, info):
+        self.write(idx, addr, self.X[idx])
+
+    def op_sty(self, idx, addr, info):
+        self.write(idx, addr, self.Y[idx])
+
+    def op_tax(self, idx, addr, info):
+        self.X[idx] = val = self.AX[idx]
+        self.set_nz(idx, val)
+
+    def op_tay(self, idx, addr, info):
+        self.Y[idx] = val = self.AX[idx]
+        self.set_nz(idx, val)
+
+    def op_txa(self, idx, addr, info):
+        self.AX[idx] = val = self.X[idx]
+        self.set_nz(idx, val)
+
+    def op_tya(self, idx, addr, info):
+        self.AX[idx] = val = self.Y[idx]
+        self.set_nz(idx, val)
+
+    def op_tsx(self, idx, addr, info):
+        self.X[idx] = val = self.SP[idx] & 0xFF
+        self.set_nz(idx, val)
+
+    def op_txs(self, idx, addr, info):
+        self.SP[idx] = 0x0100 | self.X[idx]
+
+    # - Arithmetic and logic -
+
+    def add(self, idx, val, decimal):
+        # Machines with D set look the sum up in <decimal> instead
+        flags = self.flags[idx]
+        index = (flags & C) << 16 | self.AX[idx] << 8 | val
+        result = np.where(flags & D, decimal[index], ADC_TABLE[index])
+        self.flags[idx] = flags & NOT_NVZC | result >> 8
+        self.AX[idx] = result & 0xFF
+
+    def op_adc(self, idx, addr, info):
+        self.add(idx, self.read(idx, addr), ADC_BCD_TABLE)
+
+    def op_sbc(self, idx, addr, info):
+        self.add(idx, self.read(idx, addr) ^ 0xFF, SBC_BCD_TABLE)
+
+    def op_and(self, idx, addr, info):
+        self.AX[idx] = val = self.AX[idx] & self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_ora(self, idx, addr, info):
+        self.AX[idx] = val = self.AX[idx] | self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_eor(self, idx, addr, info):
+        self.AX[idx] = val = self.AX[idx] ^ self.read(idx, addr)
+        self.set_nz(idx, val)
+
+    def op_cmp(self, idx, addr, info):
+        self.flags[idx] = self.flags[idx] & NOT_NZC | CMP_TABLE[self.AX[idx] << 8 | self.read(idx, addr)]
+
+    def op_cpx(self, idx, addr, info):
+        self.flags[idx] = self.flags[idx] & NOT_NZC | CMP_TABLE[self.X[idx] << 8 | self.read(idx, addr)]
+
+    def op_cpy(self, idx, addr, info):
+        self.flags[idx] = self.flags[idx] & NOT_NZC | CMP_TABLE[self.Y[idx] << 8 | self.read(idx, addr)]
+
+    def op_bit(self, idx, addr, info):
+        val = self.read(idx, addr)
+        self.flags[idx] = self.flags[idx] & NOT_NVZ | val & (N | V) | np.where(self.AX[idx] & val, 0, Z)
+
+    # - Increments and decrements -
+
+    def modify(self, idx, addr, info, val):
+        """ Writes the result <val> of a read-modify-write instruction back and sets N and Z """
+
+        if info.mode == ACCUMULATOR:
+            self.AX[idx] = val
+        else:
+            self.write(idx, addr, val)
+
+        self.set_nz(idx, val)
+
+    def operand(self, idx, addr, info):
+        """ Returns the value a read-modify-write instruction works on """
+
+        if info.mode == ACCUMULATOR:
+            return self.AX[idx]
+
+        return self.read(idx, addr)
+
+    def op_inc(self, idx, addr, info):
+        self.modify(idx, addr, info, (self.read(idx, addr) + 1) & 0xFF)
+
+    def op_dec(self, idx, addr, info):
+        self.modify(idx, addr, info, (self.read(idx, addr) - 1) & 0xFF)
+
+    def op_inx(self, idx, addr, info):
+        self.X[idx] = val = (self.X[idx] + 1) & 0xFF
+        self.set_nz(idx, val)
+
+    def op_iny(self, idx, addr, info):
+        self.Y[idx] = val = (self.Y[idx] + 1) & 0xFF
+        self.set_nz(idx, val)
+
+    def op_dex(self, idx, addr, info):
+        self.X[idx] = val = (self.X[idx] - 1) & 0xFF
+        self.set_nz(idx, val)
+
+    def op_dey(self, idx, addr, info):
+        self.Y[idx] = val = (self.Y[idx] - 1) & 0xFF
+        self.set_nz(idx, val)
+
+    # - Shifts and rotates -
+
+    def op_asl(self, idx, addr, info):
+        val = self.operand(idx, addr, info)
+        self.flags[idx] = self.flags[idx] & ~C | val >> 7
+        self.modify(idx, addr, info, (val << 1) & 0xFF)
+
+    def op_lsr(self, idx, addr, info):
+        val = self.operand(idx, addr, info)
+        self.flags[idx] = self.flags[idx] & ~C | val & C
+        self.modify(idx, addr, info, val >> 1)
+
+    def op_rol(self, idx, addr, info):
+        val = self.operand(idx, addr, info)
+        carry = self.flags[idx] & C
+        self.flags[idx] = self.flags[idx] & ~C | val >> 7
+        self.modify(idx, addr, info, (val << 1) & 0xFF | carry)
+
+    def op_ror(self, idx, addr, info):
+        val = self.operand(idx, addr, info)
+        carry = self.flags[idx] & C
+        self.flags[idx] = self.flags[idx] & ~C | val & C
+        self.modify(idx, addr, info, val >> 1 | carry << 7)
+
+    # - Flags -
+
+    def flag(self, idx, info):
+        bit, value = FLAG_OPS[info.mnemonic]
+        self.flags[idx] = self.flags[idx] & ~bit | value
+
+    op_clc = op_sec = op_cli = op_sei = op_cld = op_sed = op_clv = lambda self, idx, addr, info: self.flag(idx, info)
+
+    # - Branches and jumps -
+
+    def branch(self, idx, addr, info):
+        # Branches are keyed by handler name, e.g. "bne"
+        bit, when_set = BRANCHES[info.mnemonic.lower()]
+        taken = (self.flags[idx] & bit) == (bit if when_set else 0)
+        if not taken.any():
+            return
+
+        idx, addr = idx[taken], addr[taken]
+
+        # Displacements are relative to the next instruction
+        origin = self.PC[idx]
+        offset = self.memory[idx, addr].astype(np.int32)
+        target = (origin + offset - (offset & 0x80) * 2) & 0xFFFF
+
+        self.PC[idx] = target
+        self.cycles[idx] += BRANCH_TAKEN_CYCLES + BRANCH_PAGE_CYCLES * ((origin ^ target) >> 8 != 0)
+
+    op_bcc = op_bcs = op_bne = op_beq = op_bpl = op_bmi = op_bvc = op_bvs = branch
+
+    def op_jmp(self, idx, addr, info):
+        self.PC[idx] = addr
+
+    def op_jsr(self, idx, addr, info):
+        # The return address pushed is that of the last byte of the JSR
+        ret = (self.PC[idx] - 1) & 0xFFFF
+        self.push(idx, ret >> 8)
+        self.push(idx, ret & 0xFF)
+        self.PC[idx] = addr
+
+    def op_rts(self, idx, addr, info):
+        lo = self.pull(idx)
+        hi = self.pull(idx)
+        self.PC[idx] = ((hi << 8 | lo) + 1) & 0xFFFF
+
+    def op_rti(self, idx, addr, info):
+        self.flags[idx] = self.pull(idx) & ~B | U
+        lo = self.pull(idx)
+        hi = self.pull(idx)
+        self.PC[idx] = hi << 8 | lo
+
+    def op_brk(self, idx, addr, info):
+        ret = (self.PC[idx] + 1) & 0xFFFF
+        self.push(idx, ret >> 8)
+        self.push(idx, ret & 0xFF)
+        self.push(idx, self.flags[idx] | B | U)
+
+        self.flags[idx] |= B
+        self.halted[idx] = True
+
+    # - Stack -
+
+    def op_pha(self, idx, addr, info):
+        self.push(idx, self.AX[idx])
+
+    def op_php(self, idx, addr, info):
+        self.push(idx, self.flags[idx] | B | U)
+
+    def op_pla(self, idx, addr, info):
+        self.AX[idx] = val = self.pull(idx)
+        self.set_nz(idx, val)
+
+    def op_plp(self, idx, addr, info):
+        self.flags[idx] = self.pull(idx) & ~B | U
+
+    def op_nop(self, idx, addr, info):
+        pass
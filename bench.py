@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026     File: bench.py |
+# +-----------------------------------------------------+
+
+from util import check_bit, set_bit, badd, bsub
+from flags import C, NOT_NZ, NOT_NZC, NOT_NVZC, NZ, ADC, CMP
+from opcodes import OPCODES, IMPLIED, ACCUMULATOR, RELATIVE, ABSOLUTE
+from cpu import CPU
+import argparse
+import json
+import timeit
+import sys
+import os
+
+
+"""
+
+    -- Flag update microbenchmark --
+
+"""
+
+
+class LegacyFlags:
+    """ Flag updates the way the instruction handlers did them before the lookup tables """
+
+    def __init__(self):
+        self.flags = 0b00100000
+
+    def zero_check(self, val):
+        if val == 0:
+            self.flags = set_bit(self.flags, 1, 1)
+        else:
+            self.flags = set_bit(self.flags, 1, 0)
+
+    def negative_check(self, val):
+        if check_bit(val, 7):
+            self.flags = set_bit(self.flags, 7, 1)
+        else:
+            self.flags = set_bit(self.flags, 7, 0)
+
+    def overflow_check(self, val1, val2):
+        val_sum = val1 + val2
+        if check_bit(val1, 7) and check_bit(val2, 7) and (not check_bit(val_sum, 7)):
+            self.flags = set_bit(self.flags, 6)
+        elif (not check_bit(val1, 7)) and (not check_bit(val2, 7)) and check_bit(val_sum, 7):
+            self.flags = set_bit(self.flags, 6)
+        else:
+            self.flags = set_bit(self.flags, 6, 0)
+
+    def load(self, val):
+        self.zero_check(val)
+        self.negative_check(val)
+
+    def adc(self, reg, val):
+        result, carry = badd(reg, val, check_bit(self.flags, 0))
+
+        if carry:
+            self.flags = set_bit(self.flags, 0, 1)
+        else:
+            self.flags = set_bit(self.flags, 0, 0)
+        self.zero_check(result)
+        self.overflow_check(reg, val)
+        self.negative_check(result)
+
+        return result
+
+    def cmp(self, reg, val):
+        result = bsub(reg, val)[0]
+
+        if reg >= val:
+            self.flags = set_bit(self.flags, 0, 1)
+        else:
+            self.flags = set_bit(self.flags, 0, 0)
+
+        if reg == val:
+            self.flags = set_bit(self.flags, 1, 1)
+        else:
+            self.flags = set_bit(self.flags, 1, 0)
+
+        self.flags = set_bit(self.flags, 7, check_bit(result, 7))
+
+
+class TableFlags:
+    """ Flag updates the way the instruction handlers do them with the lookup tables """
+
+    def __init__(self):
+        self.flags = 0b00100000
+
+    def load(self, val):
+        self.flags = self.flags & NOT_NZ | NZ[val]
+
+    def adc(self, reg, val):
+        result = ADC[(self.flags & C) << 16 | reg << 8 | val]
+        self.flags = self.flags & NOT_NVZC | result >> 8
+
+        return result & 0xFF
+
+    def cmp(self, reg, val):
+        self.flags = self.flags & NOT_NZC | CMP[reg << 8 | val]
+
+
+def bench_flags(number=20000):
+    """ Prints the cost of the flag updates of a load, an ADC and a CMP before and after the lookup tables """
+
+    values = [(reg * 37 + 11) & 0xFF for reg in range(256)]
+    pairs = list(zip(values, reversed(values)))
+
+    print("Flag update cost per instruction (ns)")
+    print("+-------------+-------------------+---------------+---------+")
+    print("| Instruction | set_bit/check_bit | Lookup tables | Speedup |")
+    print("+-------------+-------------------+---------------+---------+")
+
+    for name, run in (("LDA", lambda impl: [impl.load(val) for val in values]),
+                      ("ADC", lambda impl: [impl.adc(reg, val) for reg, val in pairs]),
+                      ("CMP", lambda impl: [impl.cmp(reg, val) for reg, val in pairs])):
+        times = []
+        for impl in (LegacyFlags(), TableFlags()):
+            seconds = min(timeit.repeat(lambda: run(impl), number=number // 256 + 1, repeat=5))
+            times.append(seconds / ((number // 256 + 1) * 256) * 1e9)
+
+        print("| {:<11} | {:>17.1f} | {:>13.1f} | {:>6.1f}x |".format(name, times[0], times[1], times[0] / times[1]))
+
+    print("+-------------+-------------------+---------------+---------+")
+
+
+"""
+
+    -- Emulator throughput --
+
+"""
+
+ORIGIN = 0x0600                             # Where benchmark programs are loaded
+OPERAND = 0x10                              # Zero page address every benchmarked instruction works on
+REPEAT = 64                                 # Copies of the instruction in each loop
+
+# Instructions that can't run alone in a loop are timed together with their counterpart
+PAIRS = {
+    "JSR": ("JSR+RTS", lambda: bytes((0x20, 0x06, 0x06, 0x4C, 0x00, 0x06, 0x60))),
+    "RTS": None,
+    "PHA": ("PHA+PLA", lambda: bytes((0x48, 0x68)) * REPEAT + bytes((0x4C, 0x00, 0x06))),
+    "PLA": None,
+    "PHP": ("PHP+PLP", lambda: bytes((0x08, 0x28)) * REPEAT + bytes((0x4C, 0x00, 0x06))),
+    "PLP": None,
+    # Pushes a return address of $0600 and the flags, so RTI lands back at the start
+    "RTI": ("RTI", lambda: bytes((0xA9, 0x06, 0x48, 0xA9, 0x00, 0x48, 0x08, 0x40))),
+    "BRK": None,                            # Stops the program
+}
+
+# Whole programs, as (ROM, cycle budget), that stop at BRK or at the budget
+WORKLOADS = (
+    ("ROM/snake.bin", 200000),
+    ("ROM/test10.bin", 200000),
+    ("ROM/test13.bin", 200000),
+)
+
+
+def opcode_program(opcode):
+    """ Returns a looping program that runs <opcode> over and over, and the name to report it under """
+
+    info = OPCODES[opcode]
+
+    if info.mnemonic in PAIRS:
+        pair = PAIRS[info.mnemonic]
+        return None if pair is None else (pair[0], pair[1]())
+
+    name = "{} {} (${:02X})".format(info.mnemonic, info.mode, opcode)
+
+    # Jumps loop onto themselves, the indirect pointer reads the same either way round
+    if info.mnemonic == "JMP":
+        if info.mode == IMPLIED:
+            return None
+        jump = bytes((opcode, OPERAND, 0x00)) if info.mode != ABSOLUTE else bytes((opcode, 0x06, 0x06))
+        return name, bytes((0xEA,)) * 6 + jump
+
+    if info.mode in (IMPLIED, ACCUMULATOR):
+        instruction = bytes((opcode,))
+    elif info.mode == RELATIVE:
+        # Branching by 0 lands on the next instruction either way
+        instruction = bytes((opcode, 0x00))
+    else:
+        instruction = bytes((opcode, OPERAND) + (0x00,) * (info.length - 2))
+
+    return name, instruction * REPEAT + bytes((0x4C, 0x00, 0x06))
+
+
+def measure(cpu, instructions, cycles=None, repeat=3):
+    """
+        Runs <cpu> from its current state <repeat> times and returns the fastest ExecutionSummary.
+        An uncounted first run compiles the blocks, restoring the state only throws away the ones it rewrites.
+    """
+
+    state = cpu.snapshot()
+    best = None
+
+    cpu.run_for(cycles=cycles, instructions=instructions)
+
+    for _ in range(repeat):
+        cpu.restore(state)
+        cpu.rng.seed(0)
+        summary = cpu.run_for(cycles=cycles, instructions=instructions)
+
+        if best is None or summary.elapsed < best.elapsed:
+            best = summary
+
+    return best
+
+
+def result(summary):
+    return {
+        "instructions": summary.instructions,
+        "cycles": summary.cycles,
+        "elapsed": summary.elapsed,
+        "ips": summary.instructions / summary.elapsed if summary.elapsed else 0.0,
+        "cps": summary.frequency,
+    }
+
+
+def bench_opcodes(instructions=20000, repeat=3, blocks=False):
+    """ Returns the throughput of every implemented opcode, and of every addressing mode, as two dicts """
+
+    cpu = CPU(mode=0, rom_path="ROM/test.bin", console=False)
+    cpu.compile_blocks(blocks)
+    cpu.reset()
+
+    opcodes = {}
+    modes = {}
+
+    for opcode, info in enumerate(OPCODES):
+        if info is None or cpu.lookup_table[opcode][0] == "unk":
+            continue
+
+        program = opcode_program(opcode)
+        if program is None:
+            continue
+        name, code = program
+
+        cpu.reset()
+        cpu.ram.fill(0, 0x100, 0)
+        if info.mnemonic == "JMP":
+            cpu.ram.write(OPERAND, 0x06)
+            cpu.ram.write(OPERAND + 1, 0x06)
+        cpu.ram.load(ORIGIN, code)
+
+        summary = measure(cpu, instructions, repeat=repeat)
+        opcodes[name] = result(summary)
+
+        # Modes are totalled over every opcode that uses them
+        total = modes.setdefault(info.mode, {"instructions": 0, "cycles": 0, "elapsed": 0.0})
+        total["instructions"] += summary.instructions
+        total["cycles"] += summary.cycles
+        total["elapsed"] += summary.elapsed
+
+    for total in modes.values():
+        total["ips"] = total["instructions"] / total["elapsed"]
+        total["cps"] = total["cycles"] / total["elapsed"]
+
+    return opcodes, modes
+
+
+def bench_roms(workloads=WORKLOADS, repeat=3, blocks=False):
+    """ Returns the throughput of whole programs """
+
+    roms = {}
+
+    for path, cycles in workloads:
+        cpu = CPU(mode=0, rom_path=path, console=False)
+        cpu.compile_blocks(blocks)
+        cpu.reset()
+
+        roms[os.path.basename(path)] = result(measure(cpu, None, cycles=cycles, repeat=repeat))
+
+    return roms
+
+
+def bench_suite(instructions=20000, repeat=3, blocks=False):
+    """ Runs every throughput benchmark and returns the results, grouped by section """
+
+    opcodes, modes = bench_opcodes(instructions, repeat, blocks)
+
+    return {
+        "opcodes": opcodes,
+        "modes": modes,
+        "roms": bench_roms(repeat=repeat, blocks=blocks),
+    }
+
+
+def regressions(baseline, results, threshold=0.1):
+    """ Returns (section, name, old ips, new ips) for every result more than <threshold> slower than <baseline> """
+
+    slower = []
+
+    for section, entries in results.items():
+        for name, entry in entries.items():
+            old = baseline.get(section, {}).get(name)
+            if old and entry["ips"] < old["ips"] * (1 - threshold):
+                slower.append((section, name, old["ips"], entry["ips"]))
+
+    return slower
+
+
+def print_results(results):
+    for section, entries in results.items():
+        print("+-{:-<32}-+-{:-<12}-+-{:-<12}-+".format("", "", ""))
+        print("| {:<32} | {:>12} | {:>12} |".format(section.capitalize(), "Instr/s", "Cycles/s"))
+        print("+-{:-<32}-+-{:-<12}-+-{:-<12}-+".format("", "", ""))
+        for name, entry in entries.items():
+            print("| {:<32} | {:>12,.0f} | {:>12,.0f} |".format(name, entry["ips"], entry["cps"]))
+    print("+-{:-<32}-+-{:-<12}-+-{:-<12}-+".format("", "", ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measures emulator speed per opcode, per addressing mode and per ROM")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--compare", help="flag results slower than this earlier JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression")
+    parser.add_argument("--instructions", type=int, default=20000, help="instructions per opcode run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--flags", action="store_true", help="also time the flag update lookup tables")
+    parser.add_argument("--compile", action="store_true", help="run compiled basic blocks")
+    args = parser.parse_args(argv)
+
+    if args.flags:
+        bench_flags()
+
+    results = bench_suite(args.instructions, args.repeat, args.compile)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        slower = regressions(baseline, results, args.threshold)
+        for section, name, old, new in slower:
+            print("REGRESSION {}/{}: {:,.0f} -> {:,.0f} instr/s ({:+.0%})".format(section, name, old, new, new / old - 1))
+
+        if slower:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
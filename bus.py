@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0      Date: 18/10/2026      File: bus.py |
+# +-----------------------------------------------------+
+
+from random import Random
+
+
+class Bus:
+    """
+        Sits between the CPU and RAM and routes every access through a 256 entry page table.
+
+        Pages without a device take the fast path straight to RAM. Pages with a device
+        hand reads and/or writes to it, so device hooks cost nothing for ordinary memory.
+    """
+
+    def __init__(self, ram):
+
+        self.ram = ram
+        self.heap = ram.heap                # Fast path for reads, RAM never reallocates it
+
+        self.read_map = [None] * 0x100      # Device handling reads from each page, None for RAM
+        self.write_map = [None] * 0x100     # Device handling writes to each page, None for RAM
+        self.zero_page = bytearray(0x100)   # Non-zero for the zero page addresses whose reads go to a device
+        self.devices = []                   # Every attached device
+
+    def attach(self, device):
+        """ Maps <device> into the pages it asks for and returns it """
+
+        for page in device.read_pages:
+            self.read_map[page] = device
+        for page in device.write_pages:
+            self.write_map[page] = device
+
+        self.devices.append(device)
+        self.map_zero_page()
+
+        return device
+
+    def detach(self, device):
+        """ Hands the pages of <device> back to RAM """
+
+        for page in device.read_pages:
+            self.read_map[page] = None
+        for page in device.write_pages:
+            self.write_map[page] = None
+
+        self.devices.remove(device)
+        self.map_zero_page()
+
+    def map_zero_page(self):
+        """ Updates <zero_page> in place, so a device on page zero only costs the addresses it serves """
+
+        for addr in range(0x100):
+            self.zero_page[addr] = not self.direct(addr)
+
+    def read(self, addr):
+        """ Returns the value at the specified address <addr> """
+
+        device = self.read_map[addr >> 8]
+        if device is None:
+            return self.heap[addr]
+
+        return device.read(addr)
+
+    def write(self, addr, data):
+        """ Writes <data> at the specified address <addr> """
+
+        device = self.write_map[addr >> 8]
+        if device is None:
+            self.ram.write(addr, data)
+        else:
+            device.write(addr, data)
+
+    def direct(self, addr):
+        """ Returns True if reading <addr> is the same as reading RAM, so it can skip the bus """
+
+        device = self.read_map[addr >> 8]
+
+        return device is None or device.direct(addr)
+
+    def volatile(self, addr):
+        """ Returns True if something other than the CPU may change the value at <addr> """
+
+        if not self.direct(addr):
+            return True
+
+        for device in self.devices:
+            if addr in device.addresses:
+                return True
+
+        return False
+
+
+"""
+
+    -- Devices --
+
+"""
+
+
+class Device:
+    """ Base for memory mapped devices, accesses fall through to RAM unless overridden """
+
+    read_pages = ()                         # Pages whose reads go to the device
+    write_pages = ()                        # Pages whose writes go to the device
+    addresses = ()                          # Addresses the device changes behind the CPU's back
+
+    def __init__(self, ram):
+        self.ram = ram
+
+    def read(self, addr):
+        return self.ram.heap[addr]
+
+    def write(self, addr, data):
+        self.ram.write(addr, data)
+
+    def direct(self, addr):
+        """ Returns True if reading <addr> doesn't involve the device at all """
+
+        return False
+
+
+class RandomByte(Device):
+    """ Returns a fresh random byte every time <addr> is read """
+
+    def __init__(self, ram, addr=0xFE, seed=None):
+        Device.__init__(self, ram)
+
+        self.addr = addr
+        self.random = Random(seed)
+
+        self.read_pages = (addr >> 8,)
+        self.addresses = (addr,)
+
+    def seed(self, seed=None):
+        """ Restarts the random sequence from <seed> """
+
+        self.random.seed(seed)
+
+    def direct(self, addr):
+        return addr != self.addr
+
+    def read(self, addr):
+        if addr != self.addr:
+            return self.ram.heap[addr]
+
+        # Leave the value in memory as well, so dumps show the last byte handed out
+        val = self.random.getrandbits(8)
+        self.ram.heap[addr] = val
+
+        return val
+
+
+class KeyLatch(Device):
+    """ Holds the code of the last key pressed at <addr>, written by the host """
+
+    def __init__(self, ram, addr=0xFF, key=0x64):
+        Device.__init__(self, ram)
+
+        self.addr = addr
+        self.key = key                      # Key the latch starts with on reset
+
+        self.addresses = (addr,)
+
+    def reset(self):
+        """ Puts the initial key back into the latch """
+
+        self.press(self.key)
+
+    def press(self, key):
+        """ Latches the key code <key> """
+
+        self.ram.write(self.addr, key)
+
+
+class Framebuffer(Device):
+    """ 32x32 screen of one byte per pixel, mapped at <start>, that keeps track of changed rows """
+
+    width = 32
+    height = 32
+
+    def __init__(self, ram, start=0x0200):
+        Device.__init__(self, ram)
+
+        self.start = start
+        self.end = start + self.width * self.height
+
+        self.write_pages = tuple(range(start >> 8, self.end >> 8))
+        self.version = 0                    # Goes up on every write to the screen
+        self.dirty = bytearray(b"\x01" * self.height)    # Rows written since the last take_dirty
+
+    def write(self, addr, data):
+        self.ram.write(addr, data)
+        self.version += 1
+        self.dirty[(addr - self.start) // self.width] = 1
+
+    def touch(self):
+        """ Marks the whole screen as changed, for when memory was replaced behind the bus """
+
+        self.version += 1
+        self.dirty[:] = b"\x01" * self.height
+
+    def take_dirty(self):
+        """ Returns the indices of the rows changed since the last call and clears them """
+
+        # The CPU thread may be marking rows meanwhile, so the flags are cleared in place, one row at
+        # a time and before the row is drawn. A row marked during the call is either returned now or
+        # stays marked for the next one, where swapping in a fresh array could lose it
+        dirty = self.dirty
+        rows = []
+
+        for row in range(self.height):
+            if dirty[row]:
+                dirty[row] = 0
+                rows.append(row)
+
+        return rows
+
+    def view(self):
+        """ Returns a zero-copy view of the screen memory """
+
+        return self.ram.view[self.start:self.end]
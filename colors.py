@@ -25,6 +25,15 @@ dark_green = (0, 128, 0)
 dark_blue = (0, 0, 128)
 dark_red = (128, 0, 0)
 
+# - Screen Palette -
+# 16 colors of the 32x32 screen at $0200, picked by the low nibble of each pixel
+screen_palette = [
+    black, white, (136, 0, 0), (170, 255, 238),
+    (204, 68, 204), (0, 204, 85), dark_blue, (238, 238, 119),
+    (221, 136, 85), (102, 68, 0), (255, 119, 119), (51, 51, 51),
+    (119, 119, 119), (170, 255, 102), light_blue, (187, 187, 187),
+]
+
 
 # - Functions -
 
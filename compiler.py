@@ -0,0 +1,870 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0    Date: 18/10/2026   File: compiler.py |
+# +-----------------------------------------------------+
+
+from flags import C, Z, I, D, B, U, V, N, NOT_C, NOT_NZ, NOT_NZC, NOT_NVZ, NOT_NVZC, NZ, ADC, ADC_BCD, SBC_BCD, CMP, SIGNED
+from opcodes import OPCODES, LENGTHS, BRANCH_TAKEN_CYCLES, BRANCH_PAGE_CYCLES
+from collections import namedtuple
+from util import evict
+import re
+
+MAX_INSTRUCTIONS = 32                       # Longest block compiled in one go
+MAX_BYTES = MAX_INSTRUCTIONS * 3            # Most memory a block can span
+
+# A compiled basic block
+#
+# count  - Instructions in the block
+# cycles - Most cycles the block can take
+# brk    - True if the block ends with BRK
+# run    - Function that runs the block on the CPU and returns how many instructions it ran
+Block = namedtuple("Block", ["start", "end", "count", "cycles", "brk", "run"])
+
+# Flag tested by each branch, and whether the branch is taken when it's set
+BRANCHES = {
+    "bcc": (C, False),
+    "bcs": (C, True),
+    "beq": (Z, True),
+    "bne": (Z, False),
+    "bpl": (N, False),
+    "bmi": (N, True),
+    "bvc": (V, False),
+    "bvs": (V, True),
+}
+
+# Instructions after which execution doesn't just carry on with the next one
+JUMPS = {"jmp", "jsr", "rts", "rti", "brk"} | set(BRANCHES)
+
+# Addressing modes whose effective address is always in the zero page
+ZERO_PAGE_MODES = ("zero_page", "zero_page_x", "zero_page_y")
+
+# ENDS[opcode] - Non-zero for the opcodes that end a block, so whatever runs next starts one
+ENDS = bytes(info is not None and info.mnemonic.lower() in JUMPS for info in OPCODES)
+
+
+class Emitter:
+    """
+        Writes the Python source of single instructions, with one emit_<name> for every
+        instruction handler name of the CPU.
+
+        The registers live in the locals a, x, y, p (flags), s (stack pointer) and c (cycles).
+        Subclasses decide where operands come from and what handing over to the next
+        instruction looks like, by way of address(), value(), exit() and leave().
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+
+        # Per instruction state while compiling
+        self.lines = []
+        self.indent = 1
+        self.pc = 0
+        self.name = None                    # Instruction handler name
+        self.mode = None
+        self.operand = None
+        self.penalty = False
+        self.target = None
+        self.next = 0                       # Address of the next instruction
+        self.jump = False                   # True if the instruction ends the block
+        self.pending = 0                    # Base cycles of the instructions compiled so far
+        self.count = 0                      # Instructions compiled so far
+
+    """
+
+        -- Code generation --
+
+    """
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def read(self, addr, zero_page=False):
+        """ Returns an expression that reads <addr>, a number or the name of a local that is in the zero page if <zero_page> """
+
+        if isinstance(addr, int):
+            if self.cpu.bus.direct(addr):
+                return "heap[{}]".format(addr)
+            return "read({})".format(addr)
+
+        # Devices on page zero only serve a few addresses, so it's looked up by address instead of by page
+        if zero_page:
+            return "(read({0}) if zmap[{0}] else heap[{0}])".format(addr)
+
+        return "(heap[{0}] if rmap[{0} >> 8] is None else read({0}))".format(addr)
+
+    def write_ram(self, addr, val):
+        self.emit("heap[{}] = {}".format(addr, val))
+        self.emit("if watched[{}]:".format(addr))
+        self.emit("    invalidate({0}, {0} + 1)".format(addr))
+        self.indent += 1
+        self.leave("True")
+        self.indent -= 1
+
+    def store(self, addr, val):
+        """ Emits a write of the expression <val> to <addr>, a number or the name of a local """
+
+        if isinstance(addr, int):
+            if self.cpu.bus.write_map[addr >> 8] is None:
+                self.write_ram(addr, val)
+            else:
+                self.emit("write({}, {})".format(addr, val))
+                self.leave("gen[0] != g")
+            return
+
+        self.emit("if wmap[{} >> 8] is None:".format(addr))
+        self.indent += 1
+        self.write_ram(addr, val)
+        self.indent -= 1
+        self.emit("else:")
+        self.indent += 1
+        self.emit("write({}, {})".format(addr, val))
+        self.leave("gen[0] != g")
+        self.indent -= 1
+
+    def push(self, val):
+        """ Emits a push of <val> onto the stack, straight to RAM like the CPU does """
+
+        self.emit("t = s")
+        self.emit("s = 0x100 | (s - 1) & 0xFF")
+        self.write_ram("t", val)
+
+    def pull(self, reg):
+        """ Emits a pull off the stack into the local <reg> """
+
+        self.emit("s = 0x100 | (s + 1) & 0xFF")
+        self.emit("{} = heap[s]".format(reg))
+
+    def address(self):
+        """ Emits the effective address calculation and returns the address, as a number or a local """
+
+        mode, op = self.mode, self.operand
+
+        if mode == "immediate" or mode == "relative":
+            return self.pc + 1
+        if mode == "zero_page" or mode == "absolute":
+            return op
+
+        if mode == "zero_page_x" or mode == "zero_page_y":
+            self.emit("ad = ({} + {}) & 0xFF".format(op, "x" if mode == "zero_page_x" else "y"))
+            return "ad"
+
+        if mode == "absolute_x" or mode == "absolute_y":
+            self.emit("ad = ({} + {}) & 0xFFFF".format(op, "x" if mode == "absolute_x" else "y"))
+            if self.penalty:
+                self.emit("if ({} ^ ad) & 0xFF00: c += 1".format(op))
+            return "ad"
+
+        if mode == "indirect":
+            # The high byte of the pointer doesn't carry into the next page
+            self.emit("ad = {} | {} << 8".format(self.read(op), self.read(op & 0xFF00 | (op + 1) & 0xFF)))
+            return "ad"
+
+        if mode == "indirect_x":
+            self.emit("t = ({} + x) & 0xFF".format(op))
+            self.emit("u = (t + 1) & 0xFF")
+            self.emit("ad = {} | {} << 8".format(self.read("t", True), self.read("u", True)))
+            return "ad"
+
+        if mode == "indirect_y":
+            self.emit("t = {} | {} << 8".format(self.read(op), self.read((op + 1) & 0xFF)))
+            self.emit("ad = (t + y) & 0xFFFF")
+            if self.penalty:
+                self.emit("if (t ^ ad) & 0xFF00: c += 1")
+            return "ad"
+
+        raise ValueError("Can't compile addressing mode " + mode)
+
+    def value(self):
+        """ Emits the effective address calculation and returns an expression for the value there """
+
+        self.target = self.address()
+
+        # Immediate operands are part of the block, which is recompiled if they change
+        if self.mode == "immediate" and self.cpu.bus.direct(self.target):
+            return str(self.cpu.ram.heap[self.target])
+
+        return self.read(self.target, self.mode in ZERO_PAGE_MODES)
+
+    def set_nz(self, reg):
+        self.emit("p = p & {} | NZ[{}]".format(NOT_NZ, reg))
+
+    """
+
+        -- Instructions --
+
+        One emit_<name> for every instruction name in the lookup table of the CPU,
+        shared by compiled blocks and the opcode handlers of the CPU
+
+    """
+
+    def emit_unk(self):
+        pass
+
+    def emit_nop(self):
+        pass
+
+    def emit_lda(self):
+        self.emit("a = " + self.value())
+        self.set_nz("a")
+
+    def emit_ldx(self):
+        self.emit("x = " + self.value())
+        self.set_nz("x")
+
+    def emit_ldy(self):
+        self.emit("y = " + self.value())
+        self.set_nz("y")
+
+    def emit_lsr(self):
+        if self.mode == "accumulator":
+            self.emit("v = a")
+            self.emit("a = v >> 1")
+            self.emit("p = p & {} | NZ[a] | v & {}".format(NOT_NZC, C))
+        else:
+            self.emit("v = " + self.value())
+            self.emit("p = p & {} | NZ[v >> 1] | v & {}".format(NOT_NZC, C))
+            self.store(self.target, "v >> 1")
+
+    def emit_asl(self):
+        if self.mode == "accumulator":
+            self.emit("v = a")
+            self.emit("a = (v << 1) & 0xFF")
+            self.emit("p = p & {} | NZ[a] | v >> 7".format(NOT_NZC))
+        else:
+            self.emit("v = " + self.value())
+            self.emit("r = (v << 1) & 0xFF")
+            self.emit("p = p & {} | NZ[r] | v >> 7".format(NOT_NZC))
+            self.store(self.target, "r")
+
+    def emit_rol(self):
+        if self.mode == "accumulator":
+            self.emit("v = a")
+            self.emit("a = (v << 1) & 0xFF | p & {}".format(C))
+            self.emit("p = p & {} | NZ[a] | v >> 7".format(NOT_NZC))
+        else:
+            self.emit("v = " + self.value())
+            self.emit("r = (v << 1) & 0xFF | p & {}".format(C))
+            self.emit("p = p & {} | NZ[r] | v >> 7".format(NOT_NZC))
+            self.store(self.target, "r")
+
+    def emit_ror(self):
+        if self.mode == "accumulator":
+            self.emit("v = a")
+            self.emit("a = v >> 1 | (p & {}) << 7".format(C))
+            self.emit("p = p & {} | NZ[a] | v & {}".format(NOT_NZC, C))
+        else:
+            self.emit("v = " + self.value())
+            self.emit("r = v >> 1 | (p & {}) << 7".format(C))
+            self.emit("p = p & {} | NZ[r] | v & {}".format(NOT_NZC, C))
+            self.store(self.target, "r")
+
+    def emit_adc(self):
+        self.emit("r = (ADC_BCD if p & {} else ADC)[(p & {}) << 16 | a << 8 | {}]".format(D, C, self.value()))
+        self.emit("p = p & {} | r >> 8".format(NOT_NVZC))
+        self.emit("a = r & 0xFF")
+
+    def emit_sbc(self):
+        self.emit("r = (SBC_BCD if p & {} else ADC)[(p & {}) << 16 | a << 8 | {} ^ 0xFF]".format(D, C, self.value()))
+        self.emit("p = p & {} | r >> 8".format(NOT_NVZC))
+        self.emit("a = r & 0xFF")
+
+    def emit_land(self):
+        self.emit("a = a & " + self.value())
+        self.set_nz("a")
+
+    def emit_eor(self):
+        self.emit("a = a ^ " + self.value())
+        self.set_nz("a")
+
+    def emit_ora(self):
+        self.emit("a = a | " + self.value())
+        self.set_nz("a")
+
+    def emit_bit(self):
+        self.emit("v = " + self.value())
+        self.emit("p = p & {} | v & 0xC0 | (0 if a & v else {})".format(NOT_NVZ, Z))
+
+    def emit_cmp(self):
+        self.emit("p = p & {} | CMP[a << 8 | {}]".format(NOT_NZC, self.value()))
+
+    def emit_cpx(self):
+        self.emit("p = p & {} | CMP[x << 8 | {}]".format(NOT_NZC, self.value()))
+
+    def emit_cpy(self):
+        self.emit("p = p & {} | CMP[y << 8 | {}]".format(NOT_NZC, self.value()))
+
+    def emit_sec(self):
+        self.emit("p |= {}".format(C))
+
+    def emit_clc(self):
+        self.emit("p &= {}".format(NOT_C))
+
+    def emit_sed(self):
+        self.emit("p |= {}".format(D))
+
+    def emit_sei(self):
+        self.emit("p |= {}".format(I))
+
+    def emit_cld(self):
+        self.emit("p &= {}".format(~D & 0xFF))
+
+    def emit_cli(self):
+        self.emit("p &= {}".format(~I & 0xFF))
+
+    def emit_clv(self):
+        self.emit("p &= {}".format(~V & 0xFF))
+
+    def emit_sta(self):
+        self.store(self.address(), "a")
+
+    def emit_stx(self):
+        self.store(self.address(), "x")
+
+    def emit_sty(self):
+        self.store(self.address(), "y")
+
+    def emit_tax(self):
+        self.emit("x = a")
+        self.set_nz("x")
+
+    def emit_txa(self):
+        self.emit("a = x")
+        self.set_nz("a")
+
+    def emit_tay(self):
+        self.emit("y = a")
+        self.set_nz("y")
+
+    def emit_tya(self):
+        self.emit("a = y")
+        self.set_nz("a")
+
+    def emit_tsx(self):
+        self.emit("x = s & 0xFF")
+        self.set_nz("x")
+
+    def emit_txs(self):
+        self.emit("s = 0x100 | x")
+
+    def emit_inc(self):
+        self.emit("v = ({} + 1) & 0xFF".format(self.value()))
+        self.set_nz("v")
+        self.store(self.target, "v")
+
+    def emit_dec(self):
+        self.emit("v = ({} - 1) & 0xFF".format(self.value()))
+        self.set_nz("v")
+        self.store(self.target, "v")
+
+    def emit_inx(self):
+        self.emit("x = (x + 1) & 0xFF")
+        self.set_nz("x")
+
+    def emit_iny(self):
+        self.emit("y = (y + 1) & 0xFF")
+        self.set_nz("y")
+
+    def emit_dex(self):
+        self.emit("x = (x - 1) & 0xFF")
+        self.set_nz("x")
+
+    def emit_dey(self):
+        self.emit("y = (y - 1) & 0xFF")
+        self.set_nz("y")
+
+    def emit_pha(self):
+        self.push("a")
+
+    def emit_php(self):
+        self.push("p | {}".format(B | U))
+
+    def emit_pla(self):
+        self.pull("a")
+        self.set_nz("a")
+
+    def emit_plp(self):
+        self.pull("v")
+        self.emit("p = v & {} | {}".format(~B & 0xFF, U))
+
+    def branch(self):
+        flag, when_set = BRANCHES[self.name]
+
+        # Displacements are relative to the next instruction
+        # The program counter wraps around at $FFFF, both ways
+        origin = (self.pc + 2) & 0xFFFF
+        target = (origin + SIGNED[self.cpu.ram.heap[self.pc + 1]]) & 0xFFFF
+
+        extra = BRANCH_TAKEN_CYCLES
+        if (origin ^ target) & 0xFF00:
+            extra += BRANCH_PAGE_CYCLES
+
+        self.emit("if {}p & {}:".format("" if when_set else "not ", flag))
+        self.indent += 1
+        self.emit("c += {}".format(extra))
+        self.exit(target)
+        self.indent -= 1
+        self.exit(origin)
+
+    emit_bcc = emit_bcs = emit_beq = emit_bne = emit_bpl = emit_bmi = emit_bvc = emit_bvs = branch
+
+    def emit_jmp(self):
+        self.exit(self.address())
+
+    def emit_jsr(self):
+        ret = (self.pc + 2) & 0xFFFF
+        self.push(ret >> 8 & 0xFF)
+        self.push(ret & 0xFF)
+        self.exit(self.operand)
+
+    def emit_rts(self):
+        self.pull("lo")
+        self.pull("hi")
+        self.exit("((hi << 8 | lo) + 1) & 0xFFFF")
+
+    def emit_rti(self):
+        self.pull("v")
+        self.emit("p = v & {} | {}".format(~B & 0xFF, U))
+        self.pull("lo")
+        self.pull("hi")
+        self.exit("hi << 8 | lo")
+
+    def emit_brk(self):
+        ret = (self.pc + 2) & 0xFFFF
+        self.push(ret >> 8 & 0xFF)
+        self.push(ret & 0xFF)
+        self.push("p | {}".format(B | U))
+        self.emit("p |= {}".format(B))
+        self.exit((self.pc + 1) & 0xFFFF)
+
+
+class BlockCompiler(Emitter):
+    """
+        Translates straight runs of instructions into Python functions, one per basic block.
+
+        A block starts at any address the CPU jumps to and ends at the first jump, branch or BRK.
+        Budgets can stop the CPU in the middle of a block, and it then interprets up to the next
+        jump instead of compiling a new block from there (see <inside>).
+        Its operands are baked into the source and the registers live in local variables,
+        so a whole block runs as one call. Blocks are made of the same instruction code as the
+        opcode handlers of the CPU, and are thrown away when the memory they were compiled from is written.
+    """
+
+    def __init__(self, cpu, max_instructions=MAX_INSTRUCTIONS):
+        Emitter.__init__(self, cpu)
+
+        self.max_instructions = max_instructions
+
+        self.blocks = {}                    # Maps start addresses to compiled Blocks
+        self.generation = [0]               # Goes up whenever cached code is written, so running blocks notice
+        self.inside = bytearray(cpu.ram.address_space)  # Non-zero past the first byte of a compiled block
+
+        self.cpu.ram.watchers.append(self.invalidate)
+
+    def clear(self):
+        """ Forgets every compiled block """
+
+        self.blocks.clear()
+        self.inside[:] = bytes(len(self.inside))
+        self.generation[0] += 1
+
+    def invalidate(self, start, end):
+        """ Forgets blocks that overlap the address range <start>:<end> """
+
+        evict(self.blocks, start, end, MAX_BYTES - 1)
+        self.generation[0] += 1
+
+        # Marks of surviving neighbours may go too, which only lets a block start there again
+        low = max(start - MAX_BYTES, 0)
+        high = min(end + MAX_BYTES, len(self.inside))
+        self.inside[low:high] = bytes(high - low)
+
+    def block(self, pc):
+        """ Returns the Block starting at <pc>, compiling it if needed, or None if it can't be compiled """
+
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.compile(pc)
+
+        return block
+
+    def compile(self, start):
+        cpu = self.cpu
+        heap = cpu.ram.heap
+
+        self.lines = []
+        self.indent = 1
+        self.pending = 0
+        self.count = 0
+
+        pc = start
+        cycles = 0
+        name = None
+
+        while self.count < self.max_instructions and pc < len(heap):
+            opcode = heap[pc]
+            name, mode = cpu.lookup_table[opcode]
+            length = LENGTHS[mode]
+
+            # Anything the compiler can't do is left to the interpreter
+            emit = getattr(self, "emit_" + name, None)
+            if emit is None or pc + length > len(heap):
+                break
+            if name in BRANCHES and not cpu.bus.direct(pc + 1):
+                break
+
+            info = OPCODES[opcode]
+            if name == "unk":
+                base, penalty = 2, False
+            else:
+                base, penalty = info.cycles, info.penalty
+
+            if length == 3:
+                operand = heap[pc + 1] | heap[pc + 2] << 8
+            elif length == 2:
+                operand = heap[pc + 1]
+            else:
+                operand = None
+
+            self.pc = pc
+            self.name = name
+            self.mode = mode
+            self.operand = operand
+            self.penalty = penalty
+            self.target = None
+            self.next = (pc + length) & 0xFFFF
+            self.jump = name in JUMPS
+
+            self.count += 1
+            self.pending += base
+            cycles += base + penalty
+            if name in BRANCHES:
+                cycles += BRANCH_TAKEN_CYCLES + BRANCH_PAGE_CYCLES
+
+            self.emit("# ${:04X} {}".format(pc, cpu.disassembler.line(pc).text))
+            emit()
+
+            pc += length
+
+            if self.jump:
+                break
+        else:
+            name = None
+
+        if not self.count:
+            return None
+
+        if name not in JUMPS:
+            self.exit(pc & 0xFFFF)
+
+        run = self.build(start, pc)
+        block = Block(start, pc, self.count, cycles, name == "brk", run)
+
+        self.blocks[start] = block
+        self.inside[start + 1:pc] = b'\x01' * (pc - start - 1)
+        cpu.ram.watch(start, pc)
+
+        return block
+
+    def build(self, start, end):
+        """ Compiles the lines of the block at <start> into a function """
+
+        bus = self.cpu.bus
+        ram = self.cpu.ram
+
+        source = "\n".join([
+            "def block(cpu):",
+            "    a = cpu.AX; x = cpu.X; y = cpu.Y; p = cpu.flags; s = cpu.SP; c = cpu.cycles",
+            "    g = gen[0]",
+        ] + self.lines)
+
+        namespace = {
+            "heap": ram.heap,
+            "watched": ram.watched,
+            "invalidate": ram.invalidate,
+            "rmap": bus.read_map,
+            "zmap": bus.zero_page,
+            "wmap": bus.write_map,
+            "read": bus.read,
+            "write": bus.write,
+            "gen": self.generation,
+            "NZ": NZ,
+            "ADC": ADC,
+            "ADC_BCD": ADC_BCD,
+            "SBC_BCD": SBC_BCD,
+            "CMP": CMP,
+        }
+        exec(compile(source, "<block ${:04X}-${:04X}>".format(start, end), "exec"), namespace)
+
+        return namespace["block"]
+
+    def exit(self, target):
+        """ Emits the code that hands the registers back to the CPU and continues at <target> """
+
+        if self.pending:
+            self.emit("c += {}".format(self.pending))
+        self.emit("cpu.AX = a; cpu.X = x; cpu.Y = y; cpu.flags = p; cpu.SP = s; cpu.cycles = c")
+        self.emit("cpu.PC = {}".format(target))
+        self.emit("return {}".format(self.count))
+
+    # Writes come last in an instruction. If one lands on cached code, the rest of
+    # the block may be stale, so the block hands over right after the instruction
+
+    def leave(self, condition):
+        """ Emits an early exit to the next instruction, taken when <condition> holds """
+
+        if self.jump:
+            return
+
+        self.emit("if {}:".format(condition))
+        self.indent += 1
+        self.exit(self.next)
+        self.indent -= 1
+
+
+# Locals the registers live in while an instruction runs, and the CPU attributes they come from
+REGISTERS = (("a", "AX"), ("x", "X"), ("y", "Y"), ("p", "flags"), ("s", "SP"), ("c", "cycles"))
+
+REGISTER = re.compile(r"\b([axypsc])\b")
+ASSIGNMENT = re.compile(r"\b([axypsc]) ([-+&|^]?=)(?!=) ?(.*)")
+
+# Stands in for the code that hands the registers back, until it's known which ones changed
+SAVE = "# save registers"
+
+
+class HandlerCompiler(Emitter):
+    """
+        Builds the interpreter's handlers, one specialized Python function per opcode.
+
+        A handler runs the instruction at cpu.PC in a single call. It fetches its own operand
+        bytes, works out the address for its addressing mode, does the work, counts its cycles
+        and moves cpu.PC on to the next instruction. Operands are read when the handler runs,
+        so one handler serves its opcode at every address and never goes stale.
+    """
+
+    def handlers(self):
+        """ Returns a list of 256 handlers, indexed by opcode """
+
+        ram = self.cpu.ram
+        bus = self.cpu.bus
+
+        names = []
+        sources = {}
+
+        for opcode in range(0x100):
+            name, mode = self.cpu.lookup_table[opcode]
+
+            # Undocumented opcodes all share one handler
+            function = name if name == "unk" else name + "_" + mode
+            if function not in sources:
+                sources[function] = self.compile(function, opcode)
+            names.append(function)
+
+        namespace = {
+            "heap": ram.heap,
+            "watched": ram.watched,
+            "invalidate": ram.invalidate,
+            "rmap": bus.read_map,
+            "zmap": bus.zero_page,
+            "wmap": bus.write_map,
+            "read": bus.read,
+            "write": bus.write,
+            "NZ": NZ,
+            "ADC": ADC,
+            "ADC_BCD": ADC_BCD,
+            "SBC_BCD": SBC_BCD,
+            "CMP": CMP,
+            "SIGNED": SIGNED,
+        }
+        exec(compile("\n\n".join(sources.values()), "<handlers>", "exec"), namespace)
+
+        return [namespace[function] for function in names]
+
+    def compile(self, function, opcode):
+        """ Returns the source of the handler <function> for <opcode> """
+
+        name, mode = self.cpu.lookup_table[opcode]
+        info = OPCODES[opcode]
+
+        self.lines = []
+        self.indent = 1
+        self.pc = "pc"
+        self.name = name
+        self.mode = mode
+        self.operand = None
+        self.target = None
+        self.next = "(pc + {}) & 0xFFFF".format(LENGTHS[mode])
+        self.jump = name in JUMPS
+        self.count = 1
+
+        # Unknown instructions take as long as a NOP
+        if name == "unk":
+            self.pending, self.penalty = 2, False
+        else:
+            self.pending, self.penalty = info.cycles, info.penalty
+
+        getattr(self, "emit_" + name)()
+        if not self.jump:
+            self.exit(self.next)
+
+        # Only the registers the instruction uses are moved in and out of locals, and a register
+        # doesn't need loading if the first unconditional thing that happens to it is an assignment
+        load = []
+        save = []
+        assigned = set()
+
+        for line in self.lines:
+            match = ASSIGNMENT.search(line)
+            if match:
+                reg, operator, expression = match.groups()
+                reads = REGISTER.findall(line[:match.start()] + expression)
+                if operator != "=":
+                    reads.append(reg)
+            else:
+                reads = REGISTER.findall(line)
+
+            for used in reads:
+                if used not in assigned and used not in load:
+                    load.append(used)
+
+            if match:
+                if reg not in save:
+                    save.append(reg)
+                if line[:match.start()] == "    ":
+                    assigned.add(reg)
+
+        restore = "; ".join("cpu.{} = {}".format(attr, reg) for reg, attr in REGISTERS if reg in save)
+
+        lines = ["def {}(cpu):".format(function), "    pc = cpu.PC"]
+        lines += ["    {} = cpu.{}".format(reg, attr) for reg, attr in REGISTERS if reg in load]
+        lines += [line.replace(SAVE, restore) for line in self.lines]
+
+        return "\n".join(lines)
+
+    """
+
+        -- Code generation --
+
+    """
+
+    def exit(self, target):
+        """ Emits the code that hands the registers back to the CPU and continues at <target> """
+
+        if self.pending:
+            self.emit("c += {}".format(self.pending))
+        self.emit(SAVE)
+        self.emit("cpu.PC = {}".format(target))
+
+        # Exits inside a condition skip the rest of the handler
+        if self.indent > 1:
+            self.emit("return")
+
+    def leave(self, condition):
+        """ Nothing runs after the instruction, so there is nothing to leave early """
+
+    def byte(self, n):
+        """ Returns an expression for the instruction byte <n> bytes after the opcode """
+
+        # The program counter, and so the operand fetch, wraps around at $FFFF
+        return "heap[(pc + {}) & 0xFFFF]".format(n)
+
+    def address(self):
+        """ Emits the operand fetch and effective address calculation, and returns the local holding the address """
+
+        mode = self.mode
+
+        if mode == "immediate":
+            self.emit("ad = (pc + 1) & 0xFFFF")
+        elif mode == "zero_page":
+            self.emit("ad = " + self.byte(1))
+        elif mode == "absolute":
+            self.emit("ad = {} | {} << 8".format(self.byte(1), self.byte(2)))
+
+        # Zero page indexing wraps around inside the zero page
+        elif mode == "zero_page_x" or mode == "zero_page_y":
+            self.emit("ad = ({} + {}) & 0xFF".format(self.byte(1), "x" if mode == "zero_page_x" else "y"))
+
+        elif mode == "absolute_x" or mode == "absolute_y":
+            self.emit("op = {} | {} << 8".format(self.byte(1), self.byte(2)))
+            self.emit("ad = (op + {}) & 0xFFFF".format("x" if mode == "absolute_x" else "y"))
+            if self.penalty:
+                self.emit("if (op ^ ad) & 0xFF00: c += 1")
+
+        elif mode == "indirect":
+            # The high byte of the pointer doesn't carry into the next page
+            self.emit("op = {} | {} << 8".format(self.byte(1), self.byte(2)))
+            self.emit("u = op & 0xFF00 | (op + 1) & 0xFF")
+            self.emit("ad = {} | {} << 8".format(self.read("op"), self.read("u")))
+
+        # The pointers of the indirect indexed modes live in the zero page
+        elif mode == "indirect_x":
+            self.emit("t = ({} + x) & 0xFF".format(self.byte(1)))
+            self.emit("u = (t + 1) & 0xFF")
+            self.emit("ad = {} | {} << 8".format(self.read("t", True), self.read("u", True)))
+
+        elif mode == "indirect_y":
+            self.emit("op = " + self.byte(1))
+            self.emit("u = (op + 1) & 0xFF")
+            self.emit("t = {} | {} << 8".format(self.read("op", True), self.read("u", True)))
+            self.emit("ad = (t + y) & 0xFFFF")
+            if self.penalty:
+                self.emit("if (t ^ ad) & 0xFF00: c += 1")
+
+        else:
+            raise ValueError("Can't compile addressing mode " + mode)
+
+        return "ad"
+
+    def value(self):
+        """ Emits the effective address calculation and returns an expression for the value there """
+
+        self.target = self.address()
+
+        return self.read(self.target, self.mode in ZERO_PAGE_MODES)
+
+    """
+
+        -- Instructions --
+
+        Only the ones that bake in their own address differ from the shared emitters
+
+    """
+
+    def branch(self):
+        flag, when_set = BRANCHES[self.name]
+
+        self.emit("if {}p & {}:".format("" if when_set else "not ", flag))
+        self.indent += 1
+
+        # Displacements are relative to the next instruction
+        self.emit("t = (pc + 2 + SIGNED[{}]) & 0xFFFF".format(self.byte(1)))
+        self.emit("c += {} if ((pc + 2) ^ t) & 0xFF00 else {}".format(
+            BRANCH_TAKEN_CYCLES + BRANCH_PAGE_CYCLES, BRANCH_TAKEN_CYCLES))
+        self.exit("t")
+        self.indent -= 1
+        self.exit("(pc + 2) & 0xFFFF")
+
+    emit_bcc = emit_bcs = emit_beq = emit_bne = emit_bpl = emit_bmi = emit_bvc = emit_bvs = branch
+
+    def emit_jsr(self):
+        # The target is fetched before the pushes, which could land on it
+        target = self.address()
+
+        self.emit("r = (pc + 2) & 0xFFFF")
+        self.push("r >> 8 & 0xFF")
+        self.push("r & 0xFF")
+        self.exit(target)
+
+    def emit_brk(self):
+        self.emit("r = (pc + 2) & 0xFFFF")
+        self.push("r >> 8 & 0xFF")
+        self.push("r & 0xFF")
+        self.push("p | {}".format(B | U))
+        self.emit("p |= {}".format(B))
+        self.exit("(pc + 1) & 0xFFFF")
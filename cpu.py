@@ -11,9 +11,68 @@
 # +-----------------------------------------------------+
 
 from util import *
+from flags import B
+from opcodes import OPCODES
 from threading import Thread
+from collections import namedtuple
 from ram import RAM
-from random import randint
+from bus import Bus, RandomByte, KeyLatch, Framebuffer
+from profiler import Profiler
+from disassembler import Disassembler
+from compiler import BlockCompiler, HandlerCompiler, ENDS
+from idle import IdleLoops
+from dashboard import Dashboard
+from loader import DEFAULT_ADDRESS
+import loader
+import struct
+import time
+
+
+# Clock rate of a real NTSC 6502, in Hz
+CLOCK_RATE = 1023000
+
+# Instruction handlers are named after their lowercase mnemonic, except where that's a Python keyword
+HANDLER_NAMES = {"AND": "land"}
+
+
+class ExecutionSummary(namedtuple("ExecutionSummary", ["instructions", "cycles", "reason", "elapsed"])):
+    """
+        Result of CPU.run_for()
+
+        instructions - Number of instructions retired
+        cycles       - Number of cycles spent
+        reason       - Why execution stopped (see the STOP_* constants)
+        elapsed      - Host time spent executing, in seconds
+    """
+
+    __slots__ = ()
+
+    @property
+    def frequency(self):
+        """ Effective clock rate in Hz """
+
+        return self.cycles / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def speed(self):
+        """ Effective clock rate as a multiple of a real 1.023 MHz 6502 """
+
+        return self.frequency / CLOCK_RATE
+
+
+# Reasons for CPU.run_for() to stop executing
+STOP_INSTRUCTIONS = "instructions"  # Instruction budget exhausted
+STOP_CYCLES = "cycles"              # Cycle budget exhausted
+STOP_BREAK = "break"                # BRK instruction executed
+STOP_HALTED = "halted"              # <running> was cleared from outside
+STOP_END = "end"                    # Program counter ran off the end of memory
+
+# Save state layout, followed by the raw memory image
+#
+# magic, version, AX, X, Y, flags, SP, PC, cycles, memory size
+STATE_MAGIC = b"6502"
+STATE_VERSION = 2
+STATE_HEADER = struct.Struct("<4sBBBBBHIQI")
 
 
 class CPU(Thread):
@@ -37,6 +96,17 @@ class CPU(Thread):
         else:
             self.ram = ram
 
+        """
+
+            -- Memory mapped I/O --
+
+        """
+        self.bus = Bus(self.ram)
+
+        self.rng = self.bus.attach(RandomByte(self.ram))            # Random byte at $FE
+        self.keyboard = self.bus.attach(KeyLatch(self.ram))         # Last key pressed at $FF
+        self.framebuffer = self.bus.attach(Framebuffer(self.ram))   # Screen at $0200-$05FF
+
         """
         
             -- Registers --
@@ -75,10 +145,19 @@ class CPU(Thread):
         self.running = False                # If true, execute instructions
         self.mode = mode                    # 0 for Asynchronous, 1 for Step
         self.rom_path = rom_path            # Path to a ROM
-        self.offset = 0                     # Memory offset of the program
-        self.rom = None                     # ROM binary information
-        self.console = console              # If true prints CPU and RAM info every tick
-        self.lookup_table = []              # Maps bytes to instructions
+        self.rom = None                     # Program the ROM was loaded as, segments and entry point
+        self.console = console              # If true shows the CPU on a dashboard while running
+        self.verbose = True                 # If true prints every executed instruction
+        self.cycles = 0                     # Number of cycles executed since power on
+        self.lookup_table = []              # Maps bytes to (instruction, addressing mode) name pairs
+        self.handlers = []                  # Maps bytes to specialized opcode handlers
+        self.dispatch = []                  # Handlers that actually run, wrapped while profiling or tracing
+        self.profiler = None                # Profiler wrapped around the handlers, if profiling
+        self.tracer = None                  # Tracer wrapped around the handlers, if tracing
+        self.disassembler = Disassembler(self.ram)  # Shows instructions in the console, never while executing
+        self.dashboard = Dashboard(self)    # Console view, redrawn on ticks while <console> is set
+        self.compiler = None                # Compiles basic blocks for run_for(), if enabled
+        self.idle = None                    # Skips idle loops in run_for(), if enabled
 
     def __repr__(self):
         sp = bfmt(self.SP, 16)
@@ -99,814 +178,352 @@ class CPU(Thread):
                 "| Running: " + run + "  | Mode: " + mode + " |  NV-BDIZC  |\n"\
                 "+=================+" + "==========================+\n"
 
-        # | Uncomment for a memory dump in case of debugging
-        # v
-        self.ram.dump_heap()
+        # Memory is dumped on demand with ram.dump_heap(), never on every refresh
 
         return state + "\n" + str(self.ram)
 
     def run(self):
         """ Starts the clock and starts executing instructions """
 
-        # Sets up instruction lookup table
-        self.setup_lookup_table()
-
-        # Sets the rom field to file contents
-        self.load_rom(self.rom_path)
+        self.reset()
 
         self.running = True
 
-        # For snake.bin, sets the lastKey variable to key_D
-        self.ram.write(0xff, 0x64)
-
-        # Starting address of program
-        self.PC = 0x0600
-
-        # Runs tick at a certain frequency if mode is 0,
-        # or as fast as possible if mode is something else
+        # Runs batches of instructions at a certain frequency if mode is 0,
+        # or steps through them one by one if mode is something else
         if self.mode == 0:
+            throttle = Throttle(self.frequency)
+            throttle.reset()
             while self.running:
-                freq(self.tick, self.frequency)
+                throttle.pace(self.run_batch(throttle.batch))
         else:
             while self.running:
                 self.tick()
 
-    def tick(self):
-        """ Fetches instruction, executes it and progresses the program counter """
+    def run_batch(self, cycles):
+        """ Runs at least <cycles> cycles worth of instructions and returns the number of cycles it took """
 
-        # Generate random number in memory location 0xFE for use in programs
-        self.ram.write(0xfe, randint(0, 255))
+        start = self.cycles
 
-        # Offset the program counter
-        self.PC += self.offset
-        index = self.PC
-        self.offset = 0
+        # Ticks print every instruction, so only hand the batch to run_for() when there is no listing to print
+        if self.verbose and not self.console:
+            while self.running and self.cycles - start < cycles:
+                self.tick()
+        else:
+            reason = self.run_for(cycles=cycles).reason
+            if reason == STOP_BREAK:
+                self.breakpoint()
+            elif reason == STOP_END:
+                self.end_of_rom()
+            elif self.console:
+                self.dashboard.update()
 
-        # Print UI into console
-        if self.console:
-            clear()
-            print(self)
+        return self.cycles - start
 
-        # Run instructions
-        self.decode_instruction(self.ram.heap[index:index+3])
+    def tick(self):
+        """ Fetches instruction, executes it and progresses the program counter """
+
+        # Refresh the dashboard, every step when stepping by hand
+        if self.console:
+            self.dashboard.update(force=self.mode != 0)
 
-        # Progress the program counter
-        self.PC += 1
+        # Run instruction, which moves the program counter on by itself
+        self.decode_instruction(self.PC)
 
         # In case of interrupt
-        if check_bit(self.flags, 4):
+        if self.flags & B:
             if self.mode != 0:
                 input()
-            self.running = False
-            if self.console:
-                clear()
-                print(self)
-            input("<Breakpoint>")
-            self.running = True
-            if self.console:
-                clear()
-                print(self)
+            self.breakpoint()
         else:
             if self.mode != 0:
                 input()
 
-    def load_rom(self, path):
-        """ Loads a file specified in <path> into memory starting from address 0x0600 """
-
-        with open(path, 'rb') as rom:
-            i = 0
-
-            for byte in rom.read():
-                self.ram.write(0x0600 + i, byte)
-                i += 1
-
-    def setup_lookup_table(self):
-        self.lookup_table = [self.unk] * 0x100
-
-        self.lookup_table[0xEA] = lambda: self.nop()
-
-        self.lookup_table[0xA9] = lambda: self.lda(self.immediate())
-        self.lookup_table[0xA5] = lambda: self.lda(self.zero_page())
-        self.lookup_table[0xB5] = lambda: self.lda(self.zero_page_x())
-        self.lookup_table[0xA1] = lambda: self.lda(self.indirect_x())
-        self.lookup_table[0xB1] = lambda: self.lda(self.indirect_y())
-
-        self.lookup_table[0xA2] = lambda: self.ldx(self.immediate())
-        self.lookup_table[0xA6] = lambda: self.ldx(self.zero_page())
-
-        self.lookup_table[0xA0] = lambda: self.ldy(self.immediate())
-
-        self.lookup_table[0x4A] = lambda: self.lsr(self.accumulator())
-        self.lookup_table[0x46] = lambda: self.lsr(self.zero_page())
-        self.lookup_table[0x4E] = lambda: self.lsr(self.absolute())
-
-        self.lookup_table[0xE9] = lambda: self.sbc(self.immediate())
-        self.lookup_table[0xE5] = lambda: self.sbc(self.zero_page())
-        self.lookup_table[0xED] = lambda: self.sbc(self.absolute())
-
-        self.lookup_table[0x38] = lambda: self.sec()
-
-        self.lookup_table[0x85] = lambda: self.sta(self.zero_page())
-        self.lookup_table[0x95] = lambda: self.sta(self.zero_page_x())
-        self.lookup_table[0x8D] = lambda: self.sta(self.absolute())
-        self.lookup_table[0x99] = lambda: self.sta(self.absolute_y())
-        self.lookup_table[0x81] = lambda: self.sta(self.indirect_x())
-        self.lookup_table[0x91] = lambda: self.sta(self.indirect_y())
-
-        self.lookup_table[0x8E] = lambda: self.stx(self.absolute())
-        self.lookup_table[0x96] = lambda: self.stx(self.zero_page_y())
-
-        self.lookup_table[0x8C] = lambda: self.sty(self.absolute())
-
-        self.lookup_table[0xAA] = lambda: self.tax()
-        self.lookup_table[0x8A] = lambda: self.txa()
-
-        self.lookup_table[0xE6] = lambda: self.inc(self.zero_page())
-        self.lookup_table[0xE8] = lambda: self.inx()
-        self.lookup_table[0xC8] = lambda: self.iny()
-
-        self.lookup_table[0xC6] = lambda: self.dec(self.zero_page())
-        self.lookup_table[0xCE] = lambda: self.dec(self.absolute())
-        self.lookup_table[0xCA] = lambda: self.dex()
+    def breakpoint(self):
+        """ Pauses execution until <Enter> is pressed """
 
-        self.lookup_table[0x29] = lambda: self.land(self.immediate())
-
-        self.lookup_table[0x69] = lambda: self.adc(self.immediate())
-        self.lookup_table[0x65] = lambda: self.adc(self.zero_page())
-
-        self.lookup_table[0x24] = lambda: self.bit(self.zero_page())
-        self.lookup_table[0x2C] = lambda: self.bit(self.absolute())
-
-        self.lookup_table[0x00] = lambda: self.brk()
-
-        self.lookup_table[0x90] = lambda: self.bcc(self.relative())
-        self.lookup_table[0xB0] = lambda: self.bcs(self.relative())
-        self.lookup_table[0xF0] = lambda: self.beq(self.relative())
-        self.lookup_table[0xD0] = lambda: self.bne(self.relative())
-        self.lookup_table[0x10] = lambda: self.bpl(self.relative())
-
-        self.lookup_table[0x18] = lambda: self.clc()
-
-        self.lookup_table[0xC9] = lambda: self.cmp(self.immediate())
-        self.lookup_table[0xC5] = lambda: self.cmp(self.zero_page())
-        self.lookup_table[0xE0] = lambda: self.cpx(self.immediate())
-        self.lookup_table[0xE4] = lambda: self.cpx(self.zero_page())
-        self.lookup_table[0xC0] = lambda: self.cpy(self.immediate())
-
-        self.lookup_table[0x4C] = lambda: self.jmp(self.absolute())
-        self.lookup_table[0x6C] = lambda: self.jmp(self.indirect())
-        self.lookup_table[0x20] = lambda: self.jsr(self.absolute())
-
-        self.lookup_table[0x60] = lambda: self.rts()
-
-        self.lookup_table[0x48] = lambda: self.pha()
-        self.lookup_table[0x68] = lambda: self.pla()
-
-    def decode_instruction(self, instruction):
-        """ Looks up instruction in memory and calls the appropriate function """
-
-        try:
-            opcode = instruction[0]
-
-            if self.console:
-                print("Current instruction: $", end='')
-                print(hfmt(opcode))
+        self.running = False
+        if self.console:
+            self.dashboard.update(force=True)
+        if self.profiler is not None:
+            print(self.profiler.table())
+        input("<Breakpoint>")
+        self.running = True
+        if self.console:
+            self.dashboard.reset()
+            self.dashboard.update(force=True)
 
-            self.lookup_table[opcode]()
+    def end_of_rom(self):
+        """ Stops execution and exits once <Enter> is pressed """
 
-        except IndexError:
-            # Stop running and set the break flag
-            self.running = False
-            self.flags = set_bit(self.flags, 4)
+        # Stop running and set the break flag
+        self.running = False
+        self.flags |= B
 
-            # Refresh UI
+        # Refresh UI
+        if self.console:
+            self.dashboard.update(force=True)
+        else:
             clear()
             print(self)
 
-            print("End of ROM")
-            input("Press <Enter> to exit...")
-            exit()
-
-    """
-    
-        -- Processor state checks --
-        
-    """
-
-    def zero_check(self, val):
-        """ Sets zero flag appropriately for the value <val> passed """
-
-        if val == 0:
-            self.flags = set_bit(self.flags, 1, 1)
-        else:
-            self.flags = set_bit(self.flags, 1, 0)
-
-    def negative_check(self, val):
-        """ Sets negative flag appropriately for the value <val> passed """
-
-        if check_bit(val, 7):
-            self.flags = set_bit(self.flags, 7, 1)
-        else:
-            self.flags = set_bit(self.flags, 7, 0)
-
-    def carry_check(self, val):
-        """ Sets carry flag appropriately for the value <val> passed """
-
-        if val > 255:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
-
-    def overflow_check(self, val1, val2):
-        """ Sets overflow flag appropriately for the values <val1> and <val2> passed """
-
-        val_sum = val1 + val2
-        if check_bit(val1, 7) and check_bit(val2, 7) and (not check_bit(val_sum, 7)):
-            self.flags = set_bit(self.flags, 6)
-        elif (not check_bit(val1, 7)) and (not check_bit(val2, 7)) and check_bit(val_sum, 7):
-            self.flags = set_bit(self.flags, 6)
-        else:
-            self.flags = set_bit(self.flags, 6, 0)
-
-    """
-    
-        -- Addressing Modes --
-    
-    """
-
-    def implied(self):
-        self.offset += 0
-
-        return None
-
-    def implicit(self):
-        self.offset += 0
-
-        return None
-
-    def accumulator(self):
-        self.offset += 0
-
-        return None
-
-    def immediate(self):
-        self.offset += 1
-
-        return self.PC + 1
-
-    def zero_page(self):
-        self.offset += 1
-
-        return self.ram.read(self.PC + 1)
-
-    def zero_page_x(self):
-        rel_addr = self.ram.read(self.PC + 1)
-
-        if rel_addr + self.X > 255:
-            addr = rel_addr + self.X - 255
-        else:
-            addr = rel_addr + self.X
-
-        self.offset += 1
-
-        return addr
-
-    def zero_page_y(self):
-        rel_addr = self.ram.read(self.PC + 1)
-
-        if rel_addr + self.Y > 255:
-            addr = rel_addr + self.Y - 255
-        else:
-            addr = rel_addr + self.Y
-
-        self.offset += 1
+        print("End of ROM")
+        if self.profiler is not None:
+            print(self.profiler.table())
+        input("Press <Enter> to exit...")
+        exit()
 
-        return addr
+    def reset(self):
+        """ Sets up the lookup table, loads the ROM and points the program counter at it """
 
-    def relative(self):
-        self.offset += 1
-
-        return self.PC + 1
-
-    def absolute(self):
-        addr = hcat(self.ram.read(self.PC + 2), self.ram.read(self.PC + 1))
-
-        self.offset += 2
-
-        return addr
-
-    def absolute_x(self):
-        addr = hcat(self.ram.read(self.PC + 2), self.ram.read(self.PC + 1)) + self.X
-
-        self.offset += 2
-
-        return addr
-
-    def absolute_y(self):
-        addr = hcat(self.ram.read(self.PC + 2), self.ram.read(self.PC + 1)) + self.Y
-
-        self.offset += 2
-
-        return addr
-
-    def indirect(self):
-        addr = hcat(self.ram.read(self.PC + 2), self.ram.read(self.PC + 1))
-
-        self.offset += 2
-
-        return hcat(self.ram.read(addr), self.ram.read(addr + 1))
-
-    def indirect_x(self):
-        ind_addr = hcat(self.ram.read(self.PC + 2), self.ram.read(self.PC + 1))
-
-        if ind_addr + self.X > 255:
-            rel_addr = ind_addr + self.X - 255
-        else:
-            rel_addr = ind_addr + self.X
-
-        addr = hcat(self.ram.read(rel_addr), self.ram.read(rel_addr + 1))
-
-        self.offset += 1
-
-        return addr
-
-    def indirect_y(self):
-        addr = hcat(self.ram.read(self.ram.read(self.PC + 2) + 1), self.ram.read(self.ram.read(self.PC + 1))) + self.Y
-
-        self.offset += 1
-
-        return addr
-
-    """
-    
-        -- Instructions --
-        
-    """
-
-    """ - UNK - Unknown Instruction """
-    def unk(self, opcode=0xFF):
-        print("UNK $" + hfmt(opcode))
-
-        self.offset += 0
-
-    """ - NOP - No Operation """
-    def nop(self):
-        print("NOP")
-
-        self.offset += 0
-
-    """ - LDA - Load Accumulator - """
-    def lda(self, addr):
-        if is_immediate(addr):
-            print("LDA #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("LDA $" + hfmt(addr))
-
-        self.AX = self.ram.read(addr)
-
-        # Set zero flag
-        self.zero_check(self.AX)
-        # Set negative flag
-        self.negative_check(self.AX)
-
-    """ - LDX - Load X Register """
-    def ldx(self, addr):
-        if is_immediate(addr):
-            print("LDX #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("LDX $" + hfmt(addr))
-
-        self.X = self.ram.read(addr)
-        # Set zero flag
-        self.zero_check(self.X)
-        # Set negative flag
-        self.negative_check(self.X)
-
-    """ - LDY - Load Y Register """
-    def ldy(self, addr):
-        if is_immediate(addr):
-            print("LDY #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("LDY $" + hfmt(addr))
-
-        self.Y = self.ram.read(addr)
-        # Set zero flag
-        self.zero_check(self.Y)
-        # Set negative flag
-        self.negative_check(self.Y)
-
-    """ - LSR - Logical Shift Right """
-    def lsr(self, addr):
-        # Accumulator
-        if addr is None:
-            print("LSR")
-
-            self.flags = set_bit(self.flags, 0, check_bit(self.AX, 0))
-            self.AX = self.AX >> 1
-
-        # All other addressing modes
-        else:
-            print("LSR $" + hfmt(addr))
-
-            val = self.ram.read(addr)
-
-            self.flags = set_bit(self.flags, 0, check_bit(val, 0))
-            self.ram.write(addr, val >> 1)
-
-    """ - SBC - Subtract with Carry """
-    def sbc(self, addr):
-        if is_immediate(addr):
-            print("SBC #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("SBC $" + hfmt(addr))
-
-        val = self.ram.read(addr)
-
-        result, carry = bsub(self.AX, val)
-        result, carry = bsub(result, check_bit(self.flags, 0))
-
-        # Set carry flag
-        if carry:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
-        # Set zero flag
-        self.zero_check(result)
-        # Set overflow flag
-        self.overflow_check(self.AX, val)
-        # Set negative flag
-        self.negative_check(result)
-
-        self.AX = result
-
-    """ - SEC - Set Carry Flag """
-    def sec(self):
-        print("SEC")
-
-        self.flags = set_bit(self.flags, 0, 1)
-
-    """ - STA - Store Accumulator """
-    def sta(self, addr):
-        print("STA $" + hfmt(addr))
-
-        self.ram.write(addr, self.AX)
-
-    """ - STX - Store X Register """
-    def stx(self, addr):
-        print("STX $" + hfmt(addr))
-
-        self.ram.write(addr, self.X)
-
-    """ - STY - Store Y Register """
-    def sty(self, addr):
-        print("STY $" + hfmt(addr))
-
-        self.ram.write(addr, self.Y)
-
-    """ - TAX - Transfer Accumulator to X """
-    def tax(self):
-        print("TAX")
-
-        self.X = self.AX
-        # Set zero flag
-        self.zero_check(self.X)
-        # Set negative flag
-        self.negative_check(self.X)
-
-    """ - TXA - Transfer X to Accumulator """
-    def txa(self):
-        print("TXA")
-
-        self.AX = self.X
-
-        # Set zero flag
-        self.zero_check(self.AX)
-        # Set negative flag
-        self.negative_check(self.AX)
-
-    """ - INC - Increment Memory """
-    def inc(self, addr):
-        val = self.ram.read(addr)
-
-        self.ram.write(addr, badd(val, 1)[0])
-
-        # Set zero flag
-        self.zero_check(val)
-        # Set negative flag
-        self.negative_check(val)
-
-    """ - INX - Increment X Register """
-    def inx(self):
-        print("INX")
-
-        self.X = badd(self.X, 1)[0]
-
-        # Set zero flag
-        self.zero_check(self.X)
-        # Set negative flag
-        self.negative_check(self.X)
-
-    """ - INY - Increment Y Register """
-    def iny(self):
-        print("INY")
-
-        self.Y = badd(self.Y, 1)[0]
-
-        # Set zero flag
-        self.zero_check(self.Y)
-        # Set negative flag
-        self.negative_check(self.Y)
-
-    """ - DEC - Decrement Memory """
-    def dec(self, addr):
-        print("DEC $" + hfmt(addr))
-
-        val = self.ram.read(addr) - 1
-
-        if val < 0:
-            self.ram.write(addr, 255)
-        else:
-            self.ram.write(addr, val)
+        # Sets up instruction lookup table and the handlers
+        self.setup_lookup_table()
+        if self.compiler is not None:
+            self.compiler.clear()
+        if self.idle is not None:
+            self.idle.clear()
 
-    """ - DEX - Decrement X Register """
-    def dex(self):
-        print("DEX")
+        # Loads the ROM and remembers what went where in the rom field
+        entry = self.load_rom(self.rom_path)
 
-        if self.X - 1 < 0:
-            self.X = 255
-        else:
-            self.X -= 1
+        # For snake.bin, sets the lastKey variable to key_D
+        self.keyboard.reset()
 
-        # Set zero flag
-        self.zero_check(self.X)
-        # Set negative flag
-        self.negative_check(self.X)
+        # Starting address of program
+        self.PC = DEFAULT_ADDRESS if entry is None else entry
 
-    """ - AND - Logical AND """
-    def land(self, addr):
-        if is_immediate(addr):
-            print("AND #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("AND $" + hfmt(addr))
+    def step(self):
+        """ Executes a single instruction without touching stdout or stdin and returns its opcode """
 
-        val = self.ram.read(addr)
+        # The handler fetches its operand, counts its cycles and moves the program counter on
+        opcode = self.ram.heap[self.PC]
+        self.dispatch[opcode](self)
 
-        self.AX = self.AX & val
+        return opcode
 
-        self.zero_check(self.AX)
-        self.negative_check(self.AX)
+    def run_for(self, cycles=None, instructions=None):
+        """
+            Silently executes instructions until the <cycles> or <instructions> budget runs out,
+            the program breaks or <running> is cleared, and returns an ExecutionSummary.
+            A budget of None is unlimited. Never prints or waits for input.
 
-    """ - ADC - Add with Carry """
-    def adc(self, addr):
-        if is_immediate(addr):
-            print("ADC #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("ADC $" + hfmt(addr))
+            <running> is left the way it was found, unless it was cleared during the run.
+        """
 
-        val = self.ram.read(addr)
-        result, carry = badd(self.AX, val, check_bit(self.flags, 0))
+        if not self.lookup_table:
+            self.reset()
 
-        # Set carry flag
-        if carry:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
-        # Set zero flag
-        self.zero_check(result)
-        # Set overflow flag
-        self.overflow_check(self.AX, val)
-        # Set negative flag
-        self.negative_check(result)
-
-        self.AX = result
+        verbose = self.verbose
+        self.verbose = False
+        was_running = self.running
+        self.running = True
 
-    """ - BIT - Bit Test """
-    # Zero Page
-    def bit(self, addr):
-        print("BIT $" + hfmt(addr))
+        step = self.step
+        start_cycles = self.cycles
+        cycle_limit = None if cycles is None else start_cycles + cycles
+        count = 0
+        reason = None
+
+        # Profiling and tracing work on single instructions, so they keep blocks out
+        compiler = self.compiler if self.profiler is None and self.tracer is None else None
+        blocks = None if compiler is None else compiler.blocks
+        inside = None if compiler is None else compiler.inside
+        ends = ENDS
+        entry = False                       # True when the program counter was just jumped to
+        idle = self.idle if self.profiler is None and self.tracer is None else None
+
+        start = time.perf_counter()
+        try:
+            while self.running:
+                if instructions is not None and count >= instructions:
+                    reason = STOP_INSTRUCTIONS
+                    break
+                if cycle_limit is not None and self.cycles >= cycle_limit:
+                    reason = STOP_CYCLES
+                    break
+
+                # Skip the iterations of an idle loop that can't change the outcome
+                if idle is not None:
+                    loop = idle.loop(self.PC)
+                    if loop:
+                        skipped = idle.skip(loop, count, instructions, cycle_limit)
+                        if skipped:
+                            count += skipped
+                            entry = True
+                            continue
+
+                # Run a whole block when it can't overshoot either budget. In the middle of a compiled
+                # block, left there by a budget, the interpreter carries on to its end instead
+                if compiler is not None:
+                    pc = self.PC
+                    block = blocks.get(pc)
+                    if block is None and (entry or not inside[pc]):
+                        block = compiler.compile(pc)
+                    if block is not None \
+                            and (instructions is None or count + block.count <= instructions) \
+                            and (cycle_limit is None or self.cycles + block.cycles < cycle_limit):
+                        ran = block.run(self)
+                        count += ran
+                        entry = True
+
+                        if block.brk and ran == block.count:
+                            reason = STOP_BREAK
+                            break
+                        continue
+
+                opcode = step()
+                count += 1
+                entry = ends[opcode]
+
+                if opcode == 0x00:
+                    reason = STOP_BREAK
+                    break
+            else:
+                reason = STOP_HALTED
 
-        val = self.ram.read(addr)
+        except IndexError:
+            reason = STOP_END
 
-        if self.AX & val == 0:
-            self.flags = set_bit(self.flags, 1, 1)
-        else:
-            self.flags = set_bit(self.flags, 1, 0)
+        finally:
+            self.verbose = verbose
+            if reason != STOP_HALTED:
+                self.running = was_running
 
-        self.flags = set_bit(self.flags, 6, check_bit(val, 6))
-        self.flags = set_bit(self.flags, 7, check_bit(val, 7))
+        elapsed = time.perf_counter() - start
 
-    """ - BRK - Force Interrupt """
-    def brk(self):
-        print("BRK")
+        return ExecutionSummary(count, self.cycles - start_cycles, reason, elapsed)
 
-        # Push program counter and processor status
-        self.ram.push(self.PC, self.SP)
-        self.SP -= 1
+    def snapshot(self):
+        """ Returns the registers, cycle counter and memory image as a binary save state """
 
-        self.ram.push(self.flags, self.SP)
-        self.SP -= 1
+        header = STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, self.AX, self.X, self.Y, self.flags,
+                                   self.SP, self.PC, self.cycles, len(self.ram.heap))
 
-        # IRQ interrupt vector at $FFFE/F is loaded into the PC
-        # |
-        # v
-        # self.PC = self.ram.read(0xFFFE)
+        return b"".join((header, self.ram.view))
 
-        # Set break flag
-        self.flags = set_bit(self.flags, 4, 1)
+    def restore(self, state):
+        """ Puts the CPU and RAM back into the save state <state> made by snapshot() """
 
-    """ - BCC - Branch if Carry Clear """
-    def bcc(self, addr):
-        print("BCC $" + hfmt(addr))
+        magic, version, ax, x, y, flags, sp, pc, cycles, size = STATE_HEADER.unpack_from(state)
 
-        # If carry bit is clear add relative displacement
-        if not check_bit(self.flags, 0):
-            # If number is negative subtract it's two's complement
-            if check_bit(addr, 7):
-                num = decomp(addr)
-                self.PC -= (num + 1)
-            # If number is positive add it to the program counter
-            else:
-                self.PC += (addr + 1)
-
-    """ - BCS - Branch if Carry Set """
-    def bcs(self, addr):
-        print("BCS $" + hfmt(addr))
-
-        # If carry bit is set add relative displacement
-        if check_bit(self.flags, 0):
-            # If number is negative subtract it's two's complement
-            if check_bit(addr, 7):
-                num = decomp(addr)
-                self.PC -= (num + 1)
-            # If number is positive add it to the program counter
-            else:
-                self.PC += (addr + 1)
-
-    """ - BEQ - Branch if Equal """
-    def beq(self, addr):
-        print("BEQ $" + hfmt(addr))
-
-        # If zero bit is set add relative displacement
-        if check_bit(self.flags, 1):
-            # If number is negative subtract it's two's complement
-            if check_bit(addr, 7):
-                num = decomp(addr)
-                self.PC -= (num + 1)
-            # If number is positive add it to the program counter
-            else:
-                self.PC += (addr + 1)
+        if magic != STATE_MAGIC:
+            raise ValueError("Not a save state")
+        if version != STATE_VERSION:
+            raise ValueError("Unsupported save state version " + str(version))
+        if size != self.ram.address_space or len(state) != STATE_HEADER.size + size:
+            raise ValueError("Save state doesn't match the size of RAM")
 
-    """ - BNE - Branch if Not Equal """
-    def bne(self, addr):
-        addr = self.ram.read(addr)
+        self.ram.restore(memoryview(state)[STATE_HEADER.size:])
+        self.framebuffer.touch()
 
-        print("BNE $" + hfmt(addr))
+        self.AX, self.X, self.Y, self.flags = ax, x, y, flags
+        self.SP, self.PC, self.cycles = sp, pc, cycles
 
-        # If zero bit is clear add relative displacement
-        if not check_bit(self.flags, 1):
-            # If number is negative subtract it's two's complement
-            if check_bit(addr, 7):
-                num = decomp(addr)
-                self.PC -= (num + 1)
-            # If number is positive add it to the program counter
-            else:
-                self.PC += (addr + 1)
-
-    """ - BPL - Branch if Positive """
-    def bpl(self, addr):
-        print("BPL $" + hfmt(addr))
-
-        # If negative bit is clear add relative displacement
-        if not check_bit(self.flags, 7):
-            # If number is negative subtract it's two's complement
-            if check_bit(addr, 7):
-                num = decomp(addr)
-                self.PC -= (num + 1)
-            # If number is positive add it to the program counter
-            else:
-                self.PC += (addr + 1)
+    def save_state(self, path):
+        """ Writes a save state to the file at <path> """
 
-    """ - CLC - Clear Carry Flag """
-    def clc(self):
-        print("CLC")
+        with open(path, 'wb') as f:
+            f.write(self.snapshot())
 
-        self.flags = set_bit(self.flags, 0, 0)
+    def load_state(self, path):
+        """ Restores the save state in the file at <path> """
 
-    """ - CMP - Compare """
-    def cmp(self, addr):
-        if is_immediate(addr):
-            print("CMP #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("CMP $" + hfmt(addr))
+        with open(path, 'rb') as f:
+            self.restore(f.read())
 
-        val = self.ram.read(addr)
-        result = bsub(self.AX, val)[0]
+    def load_rom(self, path, address=None, format=None, reset=None):
+        """
+            Loads the program image at <path> into memory and returns the address it starts at.
+            Raw images go to <address>, 0x0600 by default, other formats say where they go themselves
+            (see loader.load()).
+        """
 
-        # If value of AX is greater than passed value, set carry flag
-        if self.AX >= val:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
+        self.rom = loader.load(self.ram, path, address, format, reset)
 
-        # If value of AX is equal to passed value, set zero flag
-        if self.AX == val:
-            self.flags = set_bit(self.flags, 1, 1)
-        else:
-            self.flags = set_bit(self.flags, 1, 0)
+        # Memory under the screen may have been replaced behind the bus
+        self.framebuffer.touch()
 
-        # If bit 7 of the result is set, set negative flag
-        self.flags = set_bit(self.flags, 7, check_bit(result, 7))
+        return self.rom.entry
 
-    """ - CPX - Compare X Register """
-    def cpx(self, addr):
-        if is_immediate(addr):
-            print("CPX #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("CPX $" + hfmt(addr))
+    def setup_lookup_table(self):
+        """
+            Builds the lookup table from the opcode metadata, undocumented opcodes go to unk,
+            and compiles a specialized handler for every opcode in it
+        """
 
-        val = self.ram.read(addr)
+        self.lookup_table = [("unk", "implied")] * 0x100
 
-        result = bsub(self.X, val)[0]
+        for opcode, info in enumerate(OPCODES):
+            if info is not None:
+                self.lookup_table[opcode] = (HANDLER_NAMES.get(info.mnemonic, info.mnemonic.lower()), info.mode)
 
-        # If value of AX is greater than passed value, set carry flag
-        if self.X >= val:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
+        # Handlers fetch their own operands, so nothing decoded is kept per address
+        self.handlers = HandlerCompiler(self).handlers()
+        self.wrap_handlers()
 
-        # If value of AX is equal to passed value, set zero flag
-        if self.X == val:
-            self.flags = set_bit(self.flags, 1, 1)
-        else:
-            self.flags = set_bit(self.flags, 1, 0)
+    def wrap_handlers(self):
+        """ Points the dispatch table at the handlers, wrapped by the profiler and tracer if attached """
 
-        # If bit 7 of the result is set, set negative flag
-        self.flags = set_bit(self.flags, 7, check_bit(result, 7))
+        dispatch = self.handlers
 
-    """ - CPY - Compare Y Register """
-    def cpy(self, addr):
-        if is_immediate(addr):
-            print("CPY #$" + hfmt(self.ram.read(addr)))
-        else:
-            print("CPY $" + hfmt(addr))
+        if self.profiler is not None:
+            dispatch = [self.profiler.wrap(opcode, handler) for opcode, handler in enumerate(dispatch)]
+        if self.tracer is not None:
+            dispatch = [self.tracer.wrap(opcode, handler) for opcode, handler in enumerate(dispatch)]
 
-        val = self.ram.read(addr)
+        self.dispatch = dispatch
 
-        result = bsub(self.Y, val)[0]
+    def profile(self, enabled=True):
+        """ Starts or stops counting opcodes and hot addresses, and returns the Profiler """
 
-        # If value of AX is greater than passed value, set carry flag
-        if self.Y >= val:
-            self.flags = set_bit(self.flags, 0, 1)
-        else:
-            self.flags = set_bit(self.flags, 0, 0)
+        self.profiler = Profiler(self.ram.address_space) if enabled else None
+        self.wrap_handlers()
 
-        # If value of AX is equal to passed value, set zero flag
-        if self.Y == val:
-            self.flags = set_bit(self.flags, 1, 1)
-        else:
-            self.flags = set_bit(self.flags, 1, 0)
+        return self.profiler
 
-        # If bit 7 of the result is set, set negative flag
-        self.flags = set_bit(self.flags, 7, check_bit(result, 7))
+    def compile_blocks(self, enabled=True):
+        """ Starts or stops running compiled basic blocks in run_for(), and returns the BlockCompiler """
 
-    """ - JMP - Jump """
-    def jmp(self, addr):
-        print("JMP $" + hfmt(addr))
+        if enabled:
+            if self.compiler is None:
+                self.compiler = BlockCompiler(self)
+        elif self.compiler is not None:
+            self.ram.watchers.remove(self.compiler.invalidate)
+            self.compiler = None
 
-        self.PC = addr - 1
+        return self.compiler
 
-        self.offset = 0
+    def fast_forward(self, enabled=True):
+        """ Starts or stops skipping idle loops in run_for(), and returns the IdleLoops """
 
-    """ - JSR - Jump to Subroutine """
-    def jsr(self, addr):
-        print("JSR $" + hfmt(addr))
+        if enabled:
+            if self.idle is None:
+                self.idle = IdleLoops(self)
+        elif self.idle is not None:
+            self.ram.watchers.remove(self.idle.invalidate)
+            self.idle = None
 
-        # Push upper byte of program counter to stack
-        self.ram.push(self.PC >> 8, self.SP - 1)
-        # Push lower byte of program counter to stack
-        self.ram.push((self.PC + 2) & 0xFF, self.SP)
+        return self.idle
 
-        self.SP -= 2
+    def trace(self, tracer):
+        """ Starts recording every instruction into <tracer>, or stops if it is None, and returns it """
 
-        self.PC = addr - 3
+        self.tracer = tracer
+        self.wrap_handlers()
 
-    """ - RTS - Return from Subroutine """
-    def rts(self):
-        print("RTS")
+        return tracer
 
-        self.SP += 2
-        self.PC = hcat(self.ram.pop(self.SP - 1), self.ram.pop(self.SP))
+    def decode_instruction(self, pc):
+        """ Looks up instruction at address <pc> in memory and calls the appropriate function """
 
-    """ - PHA - Push Accumulator """
-    def pha(self):
-        print("PHA")
+        try:
+            opcode = self.ram.heap[pc]
 
-        self.ram.push(self.AX, self.SP)
-        self.SP -= 1
+            # The dashboard already shows the instruction
+            if self.verbose and not self.console:
+                print(self.disassembler.format(pc))
 
-    """ - PLA - Pull Accumulator """
-    def pla(self):
-        print("PLA")
+            self.dispatch[opcode](self)
 
-        self.SP += 1
-        self.AX = self.ram.pop(self.SP)
+        except IndexError:
+            self.end_of_rom()
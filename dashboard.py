@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0   Date: 18/10/2026   File: dashboard.py |
+# +-----------------------------------------------------+
+
+from disassembler import format_flags
+import time
+import sys
+import os
+
+# ANSI escape sequences
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE = "\x1b[K"                       # From the cursor to the end of the line
+CLEAR_BELOW = "\x1b[J"                      # From the cursor to the end of the screen
+MOVE = "\x1b[{};1H"                         # To the start of a line, counting from 1
+
+
+class Dashboard:
+    """
+        Console view of a CPU that only rewrites the lines that changed since it was last drawn,
+        at most <fps> times a second no matter how fast instructions run.
+
+        Shows the registers, flags, the top of the stack, the instructions at the program counter
+        and <rows> lines of 16 bytes of memory starting at <window>.
+    """
+
+    def __init__(self, cpu, fps=30, window=0x0000, rows=8, listing=6, out=None):
+        self.cpu = cpu
+        self.fps = fps
+        self.window = window
+        self.rows = rows
+        self.listing = listing              # Instructions shown from the program counter on
+        self.out = sys.stdout if out is None else out
+
+        self.lines = None                   # Lines currently on the screen, None if it has to be redrawn
+        self.drawn = None                   # Host time of the last draw
+
+        # Lets the Windows console understand escape sequences
+        if os.name == "nt":
+            os.system("")
+
+    def reset(self):
+        """ Redraws everything next time, for when something else printed over the dashboard """
+
+        self.lines = None
+
+    def update(self, force=False):
+        """ Draws the CPU if the last frame is old enough or <force> is set, returns True if it drew """
+
+        now = time.perf_counter()
+        if not force and self.drawn is not None and now - self.drawn < 1 / self.fps:
+            return False
+
+        self.drawn = now
+        self.draw(self.render())
+
+        return True
+
+    def render(self):
+        """ Returns the dashboard as a list of lines """
+
+        cpu = self.cpu
+        heap = cpu.ram.heap
+        pc = cpu.PC
+
+        lines = [
+            "CPU: {}    Cycles: {}    {}".format(cpu.name, cpu.cycles, "Running" if cpu.running else "Stopped"),
+            "",
+            "AX ${:02X}    X ${:02X}    Y ${:02X}    SP ${:04X}    PC ${:04X}".format(cpu.AX, cpu.X, cpu.Y, cpu.SP, pc),
+            "Flags {}  {:08b}".format(format_flags(cpu.flags), cpu.flags),
+            "Stack {}".format(heap[cpu.SP + 1:0x200][:8].hex(" ").upper() or "empty"),
+            "",
+        ]
+
+        # Instructions from the program counter on, as far as memory goes
+        addr = pc
+        for i in range(self.listing):
+            if addr >= len(heap):
+                break
+            try:
+                line = cpu.disassembler.line(addr)
+            except IndexError:
+                break
+            lines.append(("> " if i == 0 else "  ") + cpu.disassembler.format(addr))
+            addr += line.length
+        lines.extend([""] * (6 + self.listing - len(lines)))
+
+        lines.append("")
+        for row in range(self.rows):
+            start = self.window + row * 16
+            if start >= len(heap):
+                break
+            lines.append("${:04X}: {}".format(start, heap[start:start + 16].hex(" ").upper()))
+
+        return lines
+
+    def draw(self, lines):
+        """ Writes the <lines> that differ from the ones on the screen """
+
+        parts = []
+        old = self.lines
+        if old is None:
+            parts.append(CLEAR_SCREEN)
+            old = []
+
+        for row, line in enumerate(lines):
+            if row >= len(old) or old[row] != line:
+                parts.append(MOVE.format(row + 1) + line + CLEAR_LINE)
+
+        # Leaves the cursor under the dashboard, clearing whatever was printed there
+        parts.append(MOVE.format(len(lines) + 1) + CLEAR_BELOW)
+
+        self.out.write("".join(parts))
+        self.out.flush()
+
+        self.lines = lines
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0  Date: 18/10/2026 File: disassembler.py |
+# +-----------------------------------------------------+
+
+from opcodes import OPCODES
+from opcodes import IMPLIED, ACCUMULATOR, IMMEDIATE, ZERO_PAGE, ZERO_PAGE_X, ZERO_PAGE_Y, RELATIVE
+from opcodes import ABSOLUTE, ABSOLUTE_X, ABSOLUTE_Y, INDIRECT, INDIRECT_X, INDIRECT_Y
+from flags import C, Z, I, D, B, U, V, N
+from collections import namedtuple
+from util import evict
+
+# How the operand of each mode is written, by mode
+OPERAND_FORMATS = {
+    IMPLIED: "",
+    ACCUMULATOR: "A",
+    IMMEDIATE: "#${:02X}",
+    ZERO_PAGE: "${:02X}",
+    ZERO_PAGE_X: "${:02X},X",
+    ZERO_PAGE_Y: "${:02X},Y",
+    RELATIVE: "${:04X}",
+    ABSOLUTE: "${:04X}",
+    ABSOLUTE_X: "${:04X},X",
+    ABSOLUTE_Y: "${:04X},Y",
+    INDIRECT: "(${:04X})",
+    INDIRECT_X: "(${:02X},X)",
+    INDIRECT_Y: "(${:02X}),Y",
+}
+
+
+def format_instruction(pc, opcode, operand):
+    """ Returns the assembly text of <opcode> with <operand> at address <pc> """
+
+    info = OPCODES[opcode]
+    if info is None:
+        return ".byte ${:02X}".format(opcode)
+
+    # Branches show where they go rather than the displacement
+    if info.mode == RELATIVE:
+        operand = (pc + 2 + operand - (operand & 0x80) * 2) & 0xFFFF
+
+    text = OPERAND_FORMATS[info.mode].format(operand)
+
+    return info.mnemonic + " " + text if text else info.mnemonic
+
+
+def format_bytes(opcode, operand, length):
+    """ Returns the raw bytes of an instruction as hex """
+
+    return " ".join("{:02X}".format(byte) for byte in (opcode, operand & 0xFF, operand >> 8)[:length])
+
+
+def format_flags(flags):
+    """ Returns the status register as letters, upper case for the set flags, e.g. Nv-bdizC """
+
+    return "".join(name if flags & bit else name.lower() for name, bit in
+                   (("N", N), ("V", V), ("-", U), ("B", B), ("D", D), ("I", I), ("Z", Z), ("C", C)))
+
+
+# A disassembled instruction
+#
+# text - Assembly text, e.g. LDA #$05
+Line = namedtuple("Line", ["address", "opcode", "operand", "length", "text"])
+
+
+class Disassembler:
+    """
+        Disassembles memory on demand and remembers every instruction it decoded
+        until the memory under it is written to.
+    """
+
+    def __init__(self, ram):
+        self.ram = ram
+        self.cache = {}                     # Maps addresses to decoded Lines
+
+        self.ram.watchers.append(self.invalidate)
+
+    def line(self, addr):
+        """ Returns the instruction at <addr> as a Line """
+
+        line = self.cache.get(addr)
+        if line is None:
+            line = self.decode(addr)
+
+        return line
+
+    def decode(self, addr):
+        heap = self.ram.heap
+        opcode = heap[addr]
+        info = OPCODES[opcode]
+
+        # Instructions cut off by the end of memory show up as plain bytes
+        length = 1 if info is None or addr + info.length > len(heap) else info.length
+        if length == 3:
+            operand = heap[addr + 1] | heap[addr + 2] << 8
+        elif length == 2:
+            operand = heap[addr + 1]
+        else:
+            operand = 0
+
+        if length == 1 and info is not None and info.length > 1:
+            text = ".byte ${:02X}".format(opcode)
+        else:
+            text = format_instruction(addr, opcode, operand)
+
+        line = Line(addr, opcode, operand, length, text)
+        self.cache[addr] = line
+        self.ram.watch(addr, addr + length)
+
+        return line
+
+    def invalidate(self, start, end):
+        """ Forgets instructions that overlap the address range <start>:<end> """
+
+        evict(self.cache, start, end)
+
+    def disassemble(self, start, end):
+        """ Yields the Lines from <start> up to <end>, one instruction after another """
+
+        addr = start
+        while addr < end:
+            line = self.line(addr)
+            yield line
+            addr += line.length
+
+    def format(self, addr):
+        """ Returns the instruction at <addr> as a listing line with its address and bytes """
+
+        line = self.line(addr)
+
+        return "${:04X}  {:<8}  {}".format(addr, format_bytes(line.opcode, line.operand, line.length), line.text)
+
+    def listing(self, start, end):
+        """ Returns the instructions from <start> up to <end> as a listing """
+
+        return "\n".join(self.format(line.address) for line in self.disassemble(start, end))
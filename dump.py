@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0      Date: 18/10/2026     File: dump.py |
+# +-----------------------------------------------------+
+
+from util import hexdump
+from cpu import STATE_MAGIC, STATE_HEADER
+import numpy as np
+import argparse
+import sys
+
+PAGE_SIZE = 0x100
+
+
+def image(source):
+    """
+        Returns the memory image in <source> as a memoryview. <source> can be a CPU, a RAM,
+        a save state or a raw dump, or the path of a file holding one of the last two.
+    """
+
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = f.read()
+
+    source = getattr(source, "ram", source)
+    if hasattr(source, "view"):
+        return source.view
+
+    view = memoryview(source)
+
+    # Save states carry their size in the header, so a raw dump that happens to start with the magic isn't one
+    if len(view) >= STATE_HEADER.size and view[:len(STATE_MAGIC)] == STATE_MAGIC:
+        size = STATE_HEADER.unpack_from(view)[-1]
+        if len(view) == STATE_HEADER.size + size:
+            return view[STATE_HEADER.size:]
+
+    return view
+
+
+def save_raw(source, path, start=0, end=None):
+    """ Writes the memory of <source> from <start> up to <end> to <path> as raw bytes """
+
+    with open(path, 'wb') as f:
+        f.write(image(source)[start:end])
+
+
+def save_hex(source, path, start=0, end=None, width=16):
+    """ Writes the memory of <source> from <start> up to <end> to <path> as a hex dump """
+
+    with open(path, 'w', encoding="utf-8") as f:
+        f.write("\n".join(hexdump(image(source), start, end, width)) + "\n")
+
+
+def arrays(a, b, start=0, end=None):
+    a, b = image(a), image(b)
+    if len(a) != len(b):
+        raise ValueError("Memory images differ in size: {} and {} bytes".format(len(a), len(b)))
+
+    return np.frombuffer(a, dtype=np.uint8)[start:end], np.frombuffer(b, dtype=np.uint8)[start:end]
+
+
+def diff(a, b, start=0, end=None):
+    """ Returns a NumPy array of the addresses from <start> up to <end> whose bytes differ between <a> and <b> """
+
+    old, new = arrays(a, b, start, end)
+
+    return np.flatnonzero(old != new) + start
+
+
+def diff_pages(a, b):
+    """ Returns a NumPy array of the numbers of the 256 byte pages that differ between <a> and <b> """
+
+    old, new = arrays(a, b)
+    changed = old != new
+
+    # A partial last page counts as a page of its own
+    pages = -(-len(changed) // PAGE_SIZE)
+    changed = np.concatenate((changed, np.zeros(pages * PAGE_SIZE - len(changed), dtype=bool)))
+
+    return np.flatnonzero(changed.reshape(pages, PAGE_SIZE).any(axis=1))
+
+
+def format_diff(a, b, addresses):
+    """ Returns the changed <addresses> as lines of old and new bytes, one line per run of consecutive addresses """
+
+    old, new = image(a), image(b)
+    if not len(addresses):
+        return []
+
+    # Splits the sorted addresses wherever they stop being consecutive
+    breaks = np.flatnonzero(np.diff(addresses) != 1) + 1
+    firsts = np.concatenate(([0], breaks))
+    lasts = np.concatenate((breaks, [len(addresses)])) - 1
+
+    lines = []
+    for first, last in zip(addresses[firsts], addresses[lasts]):
+        first, last = int(first), int(last)
+        span = "${:04X}".format(first) if first == last else "${:04X}-${:04X}".format(first, last)
+        lines.append("{}: {} -> {}".format(span, bytes(old[first:last + 1]).hex(" ").upper(),
+                                           bytes(new[first:last + 1]).hex(" ").upper()))
+
+    return lines
+
+
+"""
+
+    -- Command line --
+
+"""
+
+def address(text):
+    """ Parses an address given as decimal, 0x or $ hex """
+
+    return int(text[1:], 16) if text.startswith("$") else int(text, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dumps and compares memory images, raw or from save states")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    hex_parser = commands.add_parser("hex", help="print a hex dump")
+    hex_parser.add_argument("path", help="raw dump or save state")
+    hex_parser.add_argument("--width", type=int, default=16, help="bytes per line")
+
+    raw_parser = commands.add_parser("raw", help="extract raw memory")
+    raw_parser.add_argument("path", help="raw dump or save state")
+    raw_parser.add_argument("output", help="file to write the raw bytes to")
+
+    diff_parser = commands.add_parser("diff", help="print the bytes that differ between two images")
+    diff_parser.add_argument("old", help="raw dump or save state")
+    diff_parser.add_argument("new", help="raw dump or save state")
+    diff_parser.add_argument("--pages", action="store_true", help="only list the pages that differ")
+
+    for command in (hex_parser, raw_parser, diff_parser):
+        command.add_argument("--start", type=address, default=0, help="first address")
+        command.add_argument("--end", type=address, default=None, help="address to stop before")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "hex":
+        print("\n".join(hexdump(image(args.path), args.start, args.end, args.width)))
+        return 0
+
+    if args.command == "raw":
+        save_raw(args.path, args.output, args.start, args.end)
+        return 0
+
+    old, new = image(args.old), image(args.new)
+    if args.pages:
+        for page in diff_pages(old, new):
+            if page * PAGE_SIZE >= args.start and (args.end is None or page * PAGE_SIZE < args.end):
+                print("${:02X}xx".format(page))
+    else:
+        for line in format_diff(old, new, diff(old, new, args.start, args.end)):
+            print(line)
+
+    # Like diff, exits with 1 when the images differ
+    return 1 if len(diff(old, new, args.start, args.end)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026     File: flags.py |
+# +-----------------------------------------------------+
+
+from array import array
+
+
+"""
+
+    -- Status register bits --
+
+"""
+
+C = 0b00000001      # Carry
+Z = 0b00000010      # Zero
+I = 0b00000100      # Interrupt disable
+D = 0b00001000      # BCD
+B = 0b00010000      # Breakpoint
+U = 0b00100000      # Unused, always set
+V = 0b01000000      # Overflow
+N = 0b10000000      # Negative
+
+# Masks that clear the flags an instruction is about to update
+NOT_C = ~C & 0xFF
+NOT_NZ = ~(N | Z) & 0xFF
+NOT_NZC = ~(N | Z | C) & 0xFF
+NOT_NVZ = ~(N | V | Z) & 0xFF
+NOT_NVZC = ~(N | V | Z | C) & 0xFF
+
+
+"""
+
+    -- Lookup tables --
+
+    Instead of testing and setting individual bits with check_bit and set_bit,
+    instructions look the new flags up by value and merge them into the status
+    register in a single expression, e.g.
+
+        self.flags = self.flags & NOT_NZ | NZ[val]
+
+"""
+
+
+def _adc(carry, a, b):
+    """ Returns the result of <a> + <b> + <carry> in the low byte and its NVZC flags in the high byte """
+
+    total = a + b + carry
+    result = total & 0xFF
+
+    flags = NZ[result]
+    if total > 0xFF:
+        flags |= C
+    # Overflow if both operands have the same sign and the result doesn't
+    if ~(a ^ b) & (a ^ result) & 0x80:
+        flags |= V
+
+    return result | flags << 8
+
+
+def _adc_bcd(carry, a, b):
+    """ Returns the decimal sum of <a> + <b> + <carry> and its NVZC flags the way the NMOS 6502 sets them """
+
+    # Adds the low digits, carrying into the high digit past 9
+    low = (a & 0x0F) + (b & 0x0F) + carry
+    if low > 0x09:
+        low = ((low + 0x06) & 0x0F) + 0x10
+    total = (a & 0xF0) + (b & 0xF0) + low
+
+    # Z comes from the binary sum, N and V from the sum before the high digit is adjusted
+    flags = Z if (a + b + carry) & 0xFF == 0 else 0
+    flags |= total & N
+    if ~(a ^ b) & (a ^ total) & 0x80:
+        flags |= V
+
+    if total > 0x9F:
+        total += 0x60
+    if total > 0xFF:
+        flags |= C
+
+    return total & 0xFF | flags << 8
+
+
+def _sbc_bcd(carry, a, b):
+    """ Returns the decimal difference of <a> - <b> - (1 - <carry>), with the same NVZC flags as in binary mode """
+
+    # Subtracts the low digits, borrowing from the high digit below 0
+    low = (a & 0x0F) - (b & 0x0F) + carry - 1
+    if low < 0:
+        low = ((low - 0x06) & 0x0F) - 0x10
+    total = (a & 0xF0) - (b & 0xF0) + low
+    if total < 0:
+        total -= 0x60
+
+    return total & 0xFF | _adc(carry, a, b ^ 0xFF) & 0xFF00
+
+
+# NZ[val] - Negative and zero flags of a byte
+NZ = bytes([(val & N) | (Z if val == 0 else 0) for val in range(256)])
+
+# ADC[carry << 16 | a << 8 | b] - Sum of two bytes and the carry, with its NVZC flags in the high byte
+#
+# Binary subtraction is addition of the one's complement, so SBC looks up b ^ 0xFF
+ADC = array('H', [_adc(carry, a, b) for carry in (0, 1) for a in range(256) for b in range(256)])
+
+# ADC_BCD and SBC_BCD - The same lookups for when the D flag is set, indexed exactly like ADC,
+# so SBC_BCD is also looked up with b ^ 0xFF. Only valid BCD operands give meaningful digits
+ADC_BCD = array('H', [_adc_bcd(carry, a, b) for carry in (0, 1) for a in range(256) for b in range(256)])
+SBC_BCD = array('H', [_sbc_bcd(carry, a, b ^ 0xFF) for carry in (0, 1) for a in range(256) for b in range(256)])
+
+# CMP[reg << 8 | val] - NZC flags of comparing a register with a value
+CMP = bytes([NZ[(reg - val) & 0xFF] | (C if reg >= val else 0) for reg in range(256) for val in range(256)])
+
+# SIGNED[val] - Byte as a two's complement number, e.g. a branch displacement
+SIGNED = tuple(val - 0x100 if val & 0x80 else val for val in range(256))
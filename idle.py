@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0      Date: 18/10/2026     File: idle.py |
+# +-----------------------------------------------------+
+
+from flags import NOT_NZ, NZ, SIGNED
+from compiler import BRANCHES
+from opcodes import OPCODES, LENGTHS, BRANCH_TAKEN_CYCLES, BRANCH_PAGE_CYCLES
+from collections import namedtuple
+from util import evict
+
+MAX_INSTRUCTIONS = 8                        # Longest loop body looked at, branch included
+MAX_BYTES = MAX_INSTRUCTIONS * 3
+
+COUNTING = "counting"                       # Counts a register down or up to zero, then falls through
+POLLING = "polling"                         # Reads memory nothing changes, so it never ends by itself
+
+# Register and step of each counting instruction
+COUNTERS = {
+    "dex": ("X", -1),
+    "dey": ("Y", -1),
+    "inx": ("X", 1),
+    "iny": ("Y", 1),
+}
+
+# Instructions that only read memory into registers and flags, so running them twice changes nothing
+READS = {"lda", "ldx", "ldy", "cmp", "cpx", "cpy", "bit", "land"}
+STATIC_READ_MODES = {"immediate", "zero_page", "absolute"}
+
+# A loop that branches back to its own first instruction
+#
+# register, step - Counter of a counting loop
+# instructions   - Instructions per iteration, branch included
+# cycles         - Cycles per iteration, with the branch taken
+Loop = namedtuple("Loop", ["start", "end", "kind", "register", "step", "instructions", "cycles"])
+
+
+class IdleLoops:
+    """
+        Finds loops that only burn time and skips over their iterations in one go.
+
+        Counting loops, a register counted to zero by DEX/DEY/INX/INY and BNE with nothing but NOPs
+        around it, are skipped to their last iteration. Polling loops, reads and compares of memory
+        no device changes, are skipped for as long as the budget lasts once one iteration showed
+        that they don't change anything. The last iteration always runs normally, so the CPU ends
+        up exactly where plain execution would have.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+
+        self.loops = {}                     # Maps addresses to their Loop, or False if there is none
+        self.probe = None                   # (start, registers, instructions) when a polling loop was last entered
+
+        self.cpu.ram.watchers.append(self.invalidate)
+
+    def clear(self):
+        """ Forgets every loop found so far """
+
+        self.loops.clear()
+        self.probe = None
+
+    def invalidate(self, start, end):
+        """ Forgets loops that overlap the address range <start>:<end> """
+
+        evict(self.loops, start, end, MAX_BYTES - 1)
+        self.probe = None
+
+    def loop(self, pc):
+        """ Returns the Loop starting at <pc>, or False if there is none """
+
+        loop = self.loops.get(pc)
+        if loop is None:
+            loop = self.analyse(pc)
+
+        return loop
+
+    def analyse(self, start):
+        cpu = self.cpu
+        heap = cpu.ram.heap
+
+        pc = start
+        counter = None
+        reads = False
+        instructions = 0
+        cycles = 0
+        loop = False
+
+        while instructions < MAX_INSTRUCTIONS and pc < len(heap):
+            opcode = heap[pc]
+            name, mode = cpu.lookup_table[opcode]
+            length = LENGTHS[mode]
+            info = OPCODES[opcode]
+
+            if name == "unk" or pc + length > len(heap):
+                break
+
+            instructions += 1
+            cycles += info.cycles
+
+            if name in BRANCHES:
+                origin = pc + 2
+                target = (origin + SIGNED[heap[pc + 1]]) & 0xFFFF
+                if target != start:
+                    break
+
+                cycles += BRANCH_TAKEN_CYCLES
+                if (origin ^ target) & 0xFF00:
+                    cycles += BRANCH_PAGE_CYCLES
+
+                # Counting loops run until the counter reaches zero, polling loops never change
+                if counter is not None and not reads and name == "bne":
+                    loop = Loop(start, origin, COUNTING, counter[0], counter[1], instructions, cycles)
+                elif counter is None and reads:
+                    loop = Loop(start, origin, POLLING, None, 0, instructions, cycles)
+                break
+
+            if name == "nop":
+                pass
+            elif name in COUNTERS and counter is None:
+                counter = COUNTERS[name]
+            elif name in READS and mode in STATIC_READ_MODES:
+                operand = heap[pc + 1] if length == 2 else heap[pc + 1] | heap[pc + 2] << 8
+                addr = pc + 1 if mode == "immediate" else operand
+                if cpu.bus.volatile(addr):
+                    break
+                reads = True
+            else:
+                break
+
+            pc += length
+
+        self.loops[start] = loop
+        if loop:
+            cpu.ram.watch(start, loop.end)
+
+        return loop
+
+    def skip(self, loop, count, instructions=None, cycle_limit=None):
+        """
+            Fast forwards the CPU, standing at the start of <loop>, by as many iterations as it safely can,
+            without going over <instructions> instructions counting from <count> or reaching <cycle_limit>.
+            Returns the number of instructions skipped.
+        """
+
+        cpu = self.cpu
+
+        if loop.kind == COUNTING:
+            value = getattr(cpu, loop.register)
+
+            # Iterations left, this one included, the counter wraps around once if it starts at 0
+            if loop.step < 0:
+                left = value or 0x100
+            else:
+                left = (0x100 - value) or 0x100
+            iterations = left - 1
+
+        else:
+            # Entering the loop, the first iteration has to run to show it leaves everything as it was
+            state = (cpu.AX, cpu.X, cpu.Y, cpu.flags, cpu.SP)
+            probe = self.probe
+            self.probe = (loop.start, state, count)
+
+            if probe is None or probe[0] != loop.start or probe[1] != state \
+                    or count - probe[2] != loop.instructions:
+                return 0
+
+            # Only a budget can end it
+            if instructions is None and cycle_limit is None:
+                return 0
+            iterations = None
+
+        if instructions is not None:
+            fit = (instructions - count) // loop.instructions
+            iterations = fit if iterations is None else min(iterations, fit)
+        if cycle_limit is not None:
+            fit = (cycle_limit - 1 - cpu.cycles) // loop.cycles
+            iterations = fit if iterations is None else min(iterations, fit)
+
+        if iterations <= 0:
+            return 0
+
+        if loop.kind == COUNTING:
+            value = (getattr(cpu, loop.register) + loop.step * iterations) & 0xFF
+            setattr(cpu, loop.register, value)
+            cpu.flags = cpu.flags & NOT_NZ | NZ[value]
+        else:
+            self.probe = (loop.start, state, count + iterations * loop.instructions)
+
+        cpu.cycles += iterations * loop.cycles
+
+        return iterations * loop.instructions
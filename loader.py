@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026    File: loader.py |
+# +-----------------------------------------------------+
+
+from collections import namedtuple
+from contextlib import contextmanager
+import struct
+import mmap
+import os
+
+# Where raw images go unless told otherwise
+DEFAULT_ADDRESS = 0x0600
+
+# Files at least this big are memory mapped instead of read into a buffer
+MMAP_THRESHOLD = 0x4000
+
+# Interrupt vectors at the top of memory
+NMI_VECTOR = 0xFFFA
+RESET_VECTOR = 0xFFFC
+IRQ_VECTOR = 0xFFFE                         # Written for images that expect it, BRK stops the CPU instead of using it
+
+# Formats by file extension, anything else is a raw image
+EXTENSIONS = {
+    ".hex": "ihex",
+    ".ihex": "ihex",
+    ".xex": "xex",
+    ".prg": "prg",
+}
+
+# Intel HEX record types
+IHEX_DATA = 0x00
+IHEX_EOF = 0x01
+IHEX_SEGMENT = 0x02                         # Segment base address, shifted left by 4
+IHEX_START_SEGMENT = 0x03                   # CS:IP start address
+IHEX_LINEAR = 0x04                          # Upper 16 bits of the address
+IHEX_START_LINEAR = 0x05                    # 32 bit start address
+
+# Atari binary files start every segment list with this marker, and run the program at RUNAD once loaded
+XEX_MARKER = 0xFFFF
+XEX_RUNAD = 0x02E0
+
+# What load() put where
+#
+# segments - (address, length) of every segment, in load order
+# entry    - Address to start executing at, None if the image doesn't say
+Program = namedtuple("Program", ["segments", "entry"])
+
+
+@contextmanager
+def mapped(path):
+    """ Opens the file at <path> as a read-only bytes-like object, memory mapped if it's large """
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            yield f.read()
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def detect(path):
+    """ Returns the format of the file at <path>, judging by its extension """
+
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "raw")
+
+
+"""
+
+    -- Formats --
+
+"""
+
+# Each one takes the contents of a file and returns ([(address, data), ...], entry)
+
+def parse_raw(data, address=DEFAULT_ADDRESS):
+    """ A plain image, loaded as a whole at <address> """
+
+    return [(address, data)], address
+
+
+def parse_prg(data, address=None):
+    """ A plain image behind its 2 byte little endian load address, as used on the Commodore 64 """
+
+    if len(data) < 2:
+        raise ValueError("PRG file too short for its load address")
+
+    address = struct.unpack_from("<H", data)[0]
+
+    return [(address, data[2:])], address
+
+
+def parse_xex(data, address=None):
+    """
+        An Atari binary file, segments of a start and an inclusive end address followed by the bytes in between.
+        Every segment may be preceded by a $FFFF marker. A segment covering RUNAD sets the entry point.
+    """
+
+    segments = []
+    entry = None
+    position = 0
+
+    while position < len(data):
+        if len(data) - position < 4:
+            raise ValueError("Truncated XEX segment header at offset {}".format(position))
+
+        start, end = struct.unpack_from("<HH", data, position)
+        if start == XEX_MARKER:
+            position += 2
+            continue
+        position += 4
+
+        if end < start or position + end - start + 1 > len(data):
+            raise ValueError("Bad XEX segment ${:04X}-${:04X}".format(start, end))
+
+        segment = data[position:position + end - start + 1]
+        segments.append((start, segment))
+        position += len(segment)
+
+        if start <= XEX_RUNAD and XEX_RUNAD + 1 <= end:
+            entry = struct.unpack_from("<H", segment, XEX_RUNAD - start)[0]
+
+    if not segments:
+        raise ValueError("XEX file has no segments")
+
+    if entry is None:
+        entry = segments[0][0]
+
+    return segments, entry
+
+
+def parse_ihex(data, address=None):
+    """ Intel HEX, with consecutive data records merged into one segment each """
+
+    segments = []
+    entry = None
+    base = 0
+    run_start = None
+    run = bytearray()
+
+    for number, line in enumerate(bytes(data).decode("ascii").splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        if not line.startswith(":"):
+            raise ValueError("Line {}: Intel HEX records start with ':'".format(number))
+
+        try:
+            record = bytes.fromhex(line[1:])
+        except ValueError:
+            raise ValueError("Line {}: not hexadecimal".format(number))
+
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ValueError("Line {}: record length doesn't match".format(number))
+        if sum(record) & 0xFF:
+            raise ValueError("Line {}: bad checksum".format(number))
+
+        length, offset, kind = record[0], record[1] << 8 | record[2], record[3]
+        payload = record[4:4 + length]
+
+        if kind == IHEX_DATA:
+            addr = base + offset
+            if addr + length > 0x10000:
+                raise ValueError("Line {}: data above $FFFF".format(number))
+
+            # Starts a new segment unless it continues the last one
+            if run_start is None or run_start + len(run) != addr:
+                if run:
+                    segments.append((run_start, bytes(run)))
+                run_start, run = addr, bytearray()
+            run += payload
+
+        elif kind == IHEX_EOF:
+            break
+        elif kind == IHEX_SEGMENT:
+            base = (payload[0] << 8 | payload[1]) << 4
+        elif kind == IHEX_LINEAR:
+            base = (payload[0] << 8 | payload[1]) << 16
+        elif kind == IHEX_START_SEGMENT:
+            entry = ((payload[0] << 8 | payload[1]) << 4) + (payload[2] << 8 | payload[3])
+        elif kind == IHEX_START_LINEAR:
+            entry = payload[0] << 24 | payload[1] << 16 | payload[2] << 8 | payload[3]
+        else:
+            raise ValueError("Line {}: unknown record type {:02X}".format(number, kind))
+
+    if run:
+        segments.append((run_start, bytes(run)))
+
+    if entry is None and segments:
+        entry = segments[0][0]
+
+    return segments, entry
+
+
+PARSERS = {
+    "raw": parse_raw,
+    "prg": parse_prg,
+    "xex": parse_xex,
+    "ihex": parse_ihex,
+}
+
+
+def vectors(reset=None, irq=None, nmi=None):
+    """ Returns the (address, data) segments that set the given interrupt vectors """
+
+    return [(addr, struct.pack("<H", value)) for addr, value in
+            ((NMI_VECTOR, nmi), (RESET_VECTOR, reset), (IRQ_VECTOR, irq)) if value is not None]
+
+
+def load(target, path, address=None, format=None, reset=None, irq=None, nmi=None):
+    """
+        Loads the image at <path> into <target>, a RAM or anything else with a load(addr, data) method,
+        and returns a Program. <format> is detected from the extension if not given, <address> only
+        applies to raw images. Every segment goes in with a single bulk copy.
+
+        Any of <reset>, <irq> and <nmi> that are given fill in the vectors at $FFFA-$FFFF,
+        <reset> may be True to point the reset vector at the entry point.
+    """
+
+    if format is None:
+        format = detect(path)
+    if format not in PARSERS:
+        raise ValueError("Unknown image format " + repr(format))
+    if address is None:
+        address = DEFAULT_ADDRESS
+
+    with mapped(path) as data:
+        segments, entry = PARSERS[format](data, address)
+
+        # Nothing to load is a broken image, not an empty program
+        if not segments:
+            raise ValueError("{}: no data records".format(path))
+
+        if reset is True:
+            reset = entry
+        segments = segments + vectors(reset, irq, nmi)
+
+        for addr, segment in segments:
+            target.load(addr, segment)
+        program = Program([(addr, len(segment)) for addr, segment in segments], entry)
+
+        # Slices of a memory mapped file have to be gone before it can be closed
+        del segments, segment
+
+    return program
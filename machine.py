@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0    Date: 18/10/2026    File: machine.py |
+# +-----------------------------------------------------+
+
+from util import Throttle
+from cpu import STOP_BREAK, STOP_END, STOP_HALTED
+import asyncio
+import time
+
+
+class Machine:
+    """
+        Runs a CPU and the components around it as coroutines on a single asyncio event loop.
+
+        The CPU executes in cycle budgeted slices of <time_slice> seconds and yields to the loop
+        between them, paced to the CPU's frequency. Renderers, input sources and metrics added
+        with add() run in the gaps instead of competing with it for the GIL from other threads.
+
+        machine.start() runs everything on a fresh event loop, await machine.run() runs it
+        inside an event loop that's already going.
+    """
+
+    def __init__(self, cpu, time_slice=0.01):
+        self.cpu = cpu
+        self.throttle = Throttle(cpu.frequency, time_slice)
+
+        self.components = []                # Coroutines running next to the CPU, cancelled when it stops
+        self.on_break = None                # Coroutine function awaited with the machine on BRK, stops it if None
+
+        self.instructions = 0               # Instructions retired since run()
+        self.cycles = 0                     # Cycles spent since run()
+        self.elapsed = 0.0                  # Host time spent executing since run(), in seconds
+        self.reason = None                  # Why the CPU last stopped executing
+
+    def add(self, component):
+        """ Runs the coroutine <component> alongside the CPU and returns it """
+
+        self.components.append(component)
+
+        return component
+
+    def stop(self):
+        """ Stops the CPU after the slice it's running """
+
+        self.cpu.running = False
+
+    async def execute(self):
+        """ Runs the CPU slice by slice until it stops, yielding to the event loop between slices """
+
+        cpu = self.cpu
+        throttle = self.throttle
+
+        cpu.running = True
+        throttle.reset()
+
+        while cpu.running:
+            summary = cpu.run_for(cycles=throttle.batch)
+
+            self.instructions += summary.instructions
+            self.cycles += summary.cycles
+            self.elapsed += summary.elapsed
+            self.reason = summary.reason
+
+            if summary.reason == STOP_BREAK:
+                if self.on_break is None:
+                    break
+                await self.on_break(self)
+            elif summary.reason in (STOP_END, STOP_HALTED):
+                break
+
+            # Always yields, even when running unthrottled
+            await asyncio.sleep(throttle.delay(summary.cycles))
+
+        cpu.running = False
+
+    async def run(self):
+        """ Resets the CPU and runs it together with every component until it stops """
+
+        self.cpu.reset()
+        self.instructions = 0
+        self.cycles = 0
+        self.elapsed = 0.0
+        self.reason = None
+
+        tasks = [asyncio.ensure_future(component) for component in self.components]
+        self.components = []
+
+        try:
+            await self.execute()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        """ Runs the machine on a new event loop, blocking until the CPU stops """
+
+        asyncio.run(self.run())
+
+    async def keys(self, source):
+        """ Input component, presses every key code that the async iterable <source> yields """
+
+        async for key in source:
+            self.cpu.keyboard.press(key)
+
+    async def report(self, interval=1.0, out=print):
+        """ Metrics component, passes a line about the speed of the last <interval> seconds to <out> """
+
+        instructions, cycles, last = self.instructions, self.cycles, time.perf_counter()
+
+        while True:
+            await asyncio.sleep(interval)
+
+            now = time.perf_counter()
+            elapsed = now - last
+            out("{} instructions, {} cycles, {:.3f} MHz".format(
+                self.instructions - instructions, self.cycles - cycles,
+                (self.cycles - cycles) / elapsed / 1e6 if elapsed else 0.0))
+
+            instructions, cycles, last = self.instructions, self.cycles, now
@@ -12,7 +12,11 @@
 
 from cpu import CPU
 from ppu import PPU
+from render import Renderer
+from machine import Machine
+from shared import start_display
 from util import *
+import asyncio
 import sys
 
 
@@ -20,25 +24,88 @@ def main():
     mode = 1
     frequency = 0
 
+    # A number on the command line is the clock rate in Hz, 0 runs as fast as possible
+    for arg in sys.argv[1:]:
+        if arg.isdigit():
+            frequency = int(arg)
+
     if len(sys.argv) >= 2:
         cpu = CPU(mode=0 if "async" in sys.argv else 1
                   , frequency=frequency,
                   console=False if "noconsole" in sys.argv else True)
 
+        # Don't print every instruction
+        if "quiet" in sys.argv:
+            cpu.verbose = False
+
+        # Count opcodes and hot addresses, shown at breakpoints and the end of the ROM
+        if "profile" in sys.argv:
+            cpu.profile()
+
+        # Run compiled basic blocks when nothing needs to be printed per instruction
+        if "jit" in sys.argv:
+            cpu.compile_blocks()
+
+        # Skip straight to the end of delay and polling loops
+        if "idle" in sys.argv:
+            cpu.fast_forward()
+
     else:
         cpu = CPU(mode=mode, frequency=frequency, console=True)
 
-    if sys.platform == "win32":
+    # Runs the CPU and the screen as coroutines on one event loop instead of threads
+    machine = Machine(cpu) if "asyncio" in sys.argv else None
+
+    # Draws the screen in a process of its own, fed through shared memory, so it never holds up the CPU
+    publisher = None
+    if "process" in sys.argv:
+        publisher, _ = start_display(cpu, window=sys.platform == "win32" and "render" not in sys.argv)
+        if machine is None:
+            publisher.start()
+        else:
+            machine.add(publisher.serve())
+
+    elif sys.platform == "win32" and "render" not in sys.argv:
         ppu = PPU(cpu)
-        ppu.start()
-
-    clear()
-    print(cpu)
-    print("6502 Emulator by Andrija Jovanovic\n")
-    print("Running ROM: ", end='')
-    print(cpu.rom_path)
-    input("\nPress <Enter> to start...")
-    cpu.start()
+        if machine is None:
+            ppu.start()
+        else:
+            machine.add(ppu.serve())
+
+    # Without a window, saves every 16th changed frame of the screen to screen.png
+    elif "render" in sys.argv:
+        renderer = Renderer(cpu)
+        if machine is None:
+            renderer.start()
+        else:
+            machine.add(renderer.serve())
+
+    # Frees the shared screen and stops the renderer process however the run ends
+    try:
+        clear()
+        print(cpu)
+        print("6502 Emulator by Andrija Jovanovic\n")
+        print("Running ROM: ", end='')
+        print(cpu.rom_path)
+        input("\nPress <Enter> to start...")
+
+        if machine is None:
+            cpu.start()
+            cpu.join()
+        else:
+            # Slices run silently, so breakpoints wait for <Enter> without blocking the event loop
+            async def breakpoint(machine):
+                await asyncio.get_running_loop().run_in_executor(None, input, "<Breakpoint>")
+
+            machine.on_break = breakpoint
+            cpu.console = cpu.verbose = False
+            if "metrics" in sys.argv:
+                machine.add(machine.report())
+            machine.start()
+            print("\nStopped:", machine.reason)
+    finally:
+        if publisher is not None:
+            publisher.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0    Date: 18/10/2026    File: opcodes.py |
+# +-----------------------------------------------------+
+
+from collections import namedtuple
+
+
+"""
+
+    -- Addressing Modes --
+
+    Mode names are the ones in the lookup table of the CPU and the compiler emitters
+
+"""
+
+IMPLIED = "implied"
+ACCUMULATOR = "accumulator"
+IMMEDIATE = "immediate"
+ZERO_PAGE = "zero_page"
+ZERO_PAGE_X = "zero_page_x"
+ZERO_PAGE_Y = "zero_page_y"
+RELATIVE = "relative"
+ABSOLUTE = "absolute"
+ABSOLUTE_X = "absolute_x"
+ABSOLUTE_Y = "absolute_y"
+INDIRECT = "indirect"
+INDIRECT_X = "indirect_x"
+INDIRECT_Y = "indirect_y"
+
+# Number of bytes an instruction takes, including the opcode
+LENGTHS = {
+    IMPLIED: 1,
+    ACCUMULATOR: 1,
+    IMMEDIATE: 2,
+    ZERO_PAGE: 2,
+    ZERO_PAGE_X: 2,
+    ZERO_PAGE_Y: 2,
+    RELATIVE: 2,
+    ABSOLUTE: 3,
+    ABSOLUTE_X: 3,
+    ABSOLUTE_Y: 3,
+    INDIRECT: 3,
+    INDIRECT_X: 2,
+    INDIRECT_Y: 2,
+}
+
+
+"""
+
+    -- Instruction Set --
+
+    All 151 documented opcodes, grouped by mnemonic,
+    as addressing mode: (opcode, base cycle count)
+
+"""
+
+INSTRUCTIONS = {
+    "ADC": {IMMEDIATE: (0x69, 2), ZERO_PAGE: (0x65, 3), ZERO_PAGE_X: (0x75, 4), ABSOLUTE: (0x6D, 4),
+            ABSOLUTE_X: (0x7D, 4), ABSOLUTE_Y: (0x79, 4), INDIRECT_X: (0x61, 6), INDIRECT_Y: (0x71, 5)},
+    "AND": {IMMEDIATE: (0x29, 2), ZERO_PAGE: (0x25, 3), ZERO_PAGE_X: (0x35, 4), ABSOLUTE: (0x2D, 4),
+            ABSOLUTE_X: (0x3D, 4), ABSOLUTE_Y: (0x39, 4), INDIRECT_X: (0x21, 6), INDIRECT_Y: (0x31, 5)},
+    "ASL": {ACCUMULATOR: (0x0A, 2), ZERO_PAGE: (0x06, 5), ZERO_PAGE_X: (0x16, 6), ABSOLUTE: (0x0E, 6),
+            ABSOLUTE_X: (0x1E, 7)},
+    "BCC": {RELATIVE: (0x90, 2)},
+    "BCS": {RELATIVE: (0xB0, 2)},
+    "BEQ": {RELATIVE: (0xF0, 2)},
+    "BIT": {ZERO_PAGE: (0x24, 3), ABSOLUTE: (0x2C, 4)},
+    "BMI": {RELATIVE: (0x30, 2)},
+    "BNE": {RELATIVE: (0xD0, 2)},
+    "BPL": {RELATIVE: (0x10, 2)},
+    "BRK": {IMPLIED: (0x00, 7)},
+    "BVC": {RELATIVE: (0x50, 2)},
+    "BVS": {RELATIVE: (0x70, 2)},
+    "CLC": {IMPLIED: (0x18, 2)},
+    "CLD": {IMPLIED: (0xD8, 2)},
+    "CLI": {IMPLIED: (0x58, 2)},
+    "CLV": {IMPLIED: (0xB8, 2)},
+    "CMP": {IMMEDIATE: (0xC9, 2), ZERO_PAGE: (0xC5, 3), ZERO_PAGE_X: (0xD5, 4), ABSOLUTE: (0xCD, 4),
+            ABSOLUTE_X: (0xDD, 4), ABSOLUTE_Y: (0xD9, 4), INDIRECT_X: (0xC1, 6), INDIRECT_Y: (0xD1, 5)},
+    "CPX": {IMMEDIATE: (0xE0, 2), ZERO_PAGE: (0xE4, 3), ABSOLUTE: (0xEC, 4)},
+    "CPY": {IMMEDIATE: (0xC0, 2), ZERO_PAGE: (0xC4, 3), ABSOLUTE: (0xCC, 4)},
+    "DEC": {ZERO_PAGE: (0xC6, 5), ZERO_PAGE_X: (0xD6, 6), ABSOLUTE: (0xCE, 6), ABSOLUTE_X: (0xDE, 7)},
+    "DEX": {IMPLIED: (0xCA, 2)},
+    "DEY": {IMPLIED: (0x88, 2)},
+    "EOR": {IMMEDIATE: (0x49, 2), ZERO_PAGE: (0x45, 3), ZERO_PAGE_X: (0x55, 4), ABSOLUTE: (0x4D, 4),
+            ABSOLUTE_X: (0x5D, 4), ABSOLUTE_Y: (0x59, 4), INDIRECT_X: (0x41, 6), INDIRECT_Y: (0x51, 5)},
+    "INC": {ZERO_PAGE: (0xE6, 5), ZERO_PAGE_X: (0xF6, 6), ABSOLUTE: (0xEE, 6), ABSOLUTE_X: (0xFE, 7)},
+    "INX": {IMPLIED: (0xE8, 2)},
+    "INY": {IMPLIED: (0xC8, 2)},
+    "JMP": {ABSOLUTE: (0x4C, 3), INDIRECT: (0x6C, 5)},
+    "JSR": {ABSOLUTE: (0x20, 6)},
+    "LDA": {IMMEDIATE: (0xA9, 2), ZERO_PAGE: (0xA5, 3), ZERO_PAGE_X: (0xB5, 4), ABSOLUTE: (0xAD, 4),
+            ABSOLUTE_X: (0xBD, 4), ABSOLUTE_Y: (0xB9, 4), INDIRECT_X: (0xA1, 6), INDIRECT_Y: (0xB1, 5)},
+    "LDX": {IMMEDIATE: (0xA2, 2), ZERO_PAGE: (0xA6, 3), ZERO_PAGE_Y: (0xB6, 4), ABSOLUTE: (0xAE, 4),
+            ABSOLUTE_Y: (0xBE, 4)},
+    "LDY": {IMMEDIATE: (0xA0, 2), ZERO_PAGE: (0xA4, 3), ZERO_PAGE_X: (0xB4, 4), ABSOLUTE: (0xAC, 4),
+            ABSOLUTE_X: (0xBC, 4)},
+    "LSR": {ACCUMULATOR: (0x4A, 2), ZERO_PAGE: (0x46, 5), ZERO_PAGE_X: (0x56, 6), ABSOLUTE: (0x4E, 6),
+            ABSOLUTE_X: (0x5E, 7)},
+    "NOP": {IMPLIED: (0xEA, 2)},
+    "ORA": {IMMEDIATE: (0x09, 2), ZERO_PAGE: (0x05, 3), ZERO_PAGE_X: (0x15, 4), ABSOLUTE: (0x0D, 4),
+            ABSOLUTE_X: (0x1D, 4), ABSOLUTE_Y: (0x19, 4), INDIRECT_X: (0x01, 6), INDIRECT_Y: (0x11, 5)},
+    "PHA": {IMPLIED: (0x48, 3)},
+    "PHP": {IMPLIED: (0x08, 3)},
+    "PLA": {IMPLIED: (0x68, 4)},
+    "PLP": {IMPLIED: (0x28, 4)},
+    "ROL": {ACCUMULATOR: (0x2A, 2), ZERO_PAGE: (0x26, 5), ZERO_PAGE_X: (0x36, 6), ABSOLUTE: (0x2E, 6),
+            ABSOLUTE_X: (0x3E, 7)},
+    "ROR": {ACCUMULATOR: (0x6A, 2), ZERO_PAGE: (0x66, 5), ZERO_PAGE_X: (0x76, 6), ABSOLUTE: (0x6E, 6),
+            ABSOLUTE_X: (0x7E, 7)},
+    "RTI": {IMPLIED: (0x40, 6)},
+    "RTS": {IMPLIED: (0x60, 6)},
+    "SBC": {IMMEDIATE: (0xE9, 2), ZERO_PAGE: (0xE5, 3), ZERO_PAGE_X: (0xF5, 4), ABSOLUTE: (0xED, 4),
+            ABSOLUTE_X: (0xFD, 4), ABSOLUTE_Y: (0xF9, 4), INDIRECT_X: (0xE1, 6), INDIRECT_Y: (0xF1, 5)},
+    "SEC": {IMPLIED: (0x38, 2)},
+    "SED": {IMPLIED: (0xF8, 2)},
+    "SEI": {IMPLIED: (0x78, 2)},
+    "STA": {ZERO_PAGE: (0x85, 3), ZERO_PAGE_X: (0x95, 4), ABSOLUTE: (0x8D, 4), ABSOLUTE_X: (0x9D, 5),
+            ABSOLUTE_Y: (0x99, 5), INDIRECT_X: (0x81, 6), INDIRECT_Y: (0x91, 6)},
+    "STX": {ZERO_PAGE: (0x86, 3), ZERO_PAGE_Y: (0x96, 4), ABSOLUTE: (0x8E, 4)},
+    "STY": {ZERO_PAGE: (0x84, 3), ZERO_PAGE_X: (0x94, 4), ABSOLUTE: (0x8C, 4)},
+    "TAX": {IMPLIED: (0xAA, 2)},
+    "TAY": {IMPLIED: (0xA8, 2)},
+    "TSX": {IMPLIED: (0xBA, 2)},
+    "TXA": {IMPLIED: (0x8A, 2)},
+    "TXS": {IMPLIED: (0x9A, 2)},
+    "TYA": {IMPLIED: (0x98, 2)},
+}
+
+# Instructions that only read memory take an extra cycle
+# when indexing carries the effective address into the next page
+PAGE_PENALTY_MNEMONICS = {"ADC", "AND", "CMP", "EOR", "LDA", "LDX", "LDY", "ORA", "SBC"}
+PAGE_PENALTY_MODES = {ABSOLUTE_X, ABSOLUTE_Y, INDIRECT_Y}
+
+# Branches take an extra cycle when taken, and another one when the target is on a different page
+BRANCH_TAKEN_CYCLES = 1
+BRANCH_PAGE_CYCLES = 1
+
+# Decoded form of an opcode byte
+#
+# cycles  - Base cycle count
+# penalty - True if crossing a page while indexing costs an extra cycle
+Opcode = namedtuple("Opcode", ["mnemonic", "mode", "length", "cycles", "penalty"])
+
+# OPCODES[byte] - Opcode metadata, None for undocumented opcodes
+OPCODES = [None] * 0x100
+
+for _mnemonic, _modes in INSTRUCTIONS.items():
+    for _mode, (_opcode, _cycles) in _modes.items():
+        _penalty = _mnemonic in PAGE_PENALTY_MNEMONICS and _mode in PAGE_PENALTY_MODES
+        OPCODES[_opcode] = Opcode(_mnemonic, _mode, LENGTHS[_mode], _cycles, _penalty)
@@ -13,6 +13,7 @@
 from colors import *
 from threading import Thread
 import random
+import asyncio
 import numpy as np
 import sys
 import os
@@ -42,14 +43,19 @@ class PPU(Thread):
         self.height = None
         self.screen = None
         self.buffer = None
+        self.dirty = []
+        self.version = None
         self.title = title
 
         self.scale = scale
         self.intensity = intensity
 
+        # Maps a pixel value straight to its brightness, so a frame is converted in one lookup
+        self.levels = np.minimum(np.arange(256) * intensity, 255).astype(np.uint8)
+
         self.cpu = cpu
 
-    def run(self):
+    def setup(self):
         # Initialise PyGame.
         pygame.init()
 
@@ -68,6 +74,9 @@ class PPU(Thread):
         # PyGame surfaces can be thought of as screen sections that you can draw onto.
         # You can also draw surfaces onto other surfaces, rotate surfaces, and transform surfaces.
 
+    def run(self):
+        self.setup()
+
         # Main game loop.
         dt = 1 / self.FPS  # dt is the time since last frame.
         while True:  # Loop forever!
@@ -76,6 +85,19 @@ class PPU(Thread):
 
             dt = self.clock.tick(self.FPS)
 
+    async def serve(self):
+        """ Same as run(), as a coroutine for a Machine, sleeping on the event loop between frames """
+
+        self.setup()
+
+        dt = 1 / self.FPS
+        while True:
+            self.update(dt)
+            self.draw()
+
+            await asyncio.sleep(1 / self.FPS)
+            dt = self.clock.tick()
+
     def update(self, dt):
         """
         Update game. Called once per frame.
@@ -99,30 +121,32 @@ class PPU(Thread):
                 # on other operating systems too, but I don't know for sure.
             # Handle other events as you wish.
 
-        # Reads 32*32 values from memory starting at 0x0200
-        self.buffer = []
+        # Views 32*32 values from memory starting at 0x0200
+        self.buffer = self.cpu.framebuffer.view()
 
-        for i in range(0, 32*32):
-            self.buffer.append(self.cpu.ram.heap[0x0200+i])
+        # Nothing to redraw unless the screen was written since the last frame
+        version = self.cpu.framebuffer.version
+        if version == self.version:
+            self.dirty = []
+            return
+
+        self.version = version
+        self.dirty = self.cpu.framebuffer.take_dirty()
 
     def draw(self):
         """
-        Draw things to the window. Called once per frame.
+        Draw things to the window. Called once per frame, skipped when the screen didn't change.
         """
-        self.screen.fill((0, 0, 0))  # Fill the screen with black.
-
-        # Redraw screen here
+        if not self.dirty:
+            return
 
-        # Reshapes buffer to 2D array and draws it to the screen
-        buff = np.reshape(self.buffer, (-1, 32))
+        # Scales the 32x32 screen up with NumPy and blits the whole image in one go
+        frame = self.levels[np.frombuffer(self.buffer, dtype=np.uint8).reshape(-1, 32)]
+        frame = frame.repeat(self.scale, axis=0).repeat(self.scale, axis=1)
 
-        for y, line in enumerate(buff):
-            for x, val in enumerate(line):
-                if val * self.intensity > 255:
-                    val = 255
-                pygame.draw.rect(self.screen,
-                                 (val*self.intensity, val*self.intensity, val*self.intensity),
-                                 Rect(x*self.scale, y*self.scale, self.scale, self.scale))
+        # Surface arrays are indexed [x][y], with one channel per color
+        pixels = np.repeat(frame.T[:, :, np.newaxis], 3, axis=2)
+        pygame.surfarray.blit_array(self.screen, pixels)
 
-        # Flip the display so that the things we drew actually show up.
-        pygame.display.flip()
+        # Only pushes the rows that changed to the display
+        pygame.display.update([Rect(0, y*self.scale, self.width, self.scale) for y in self.dirty])
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0    Date: 18/10/2026   File: profiler.py |
+# +-----------------------------------------------------+
+
+from opcodes import OPCODES
+import json
+import time
+
+
+class Profiler:
+    """
+        Counts how many times each opcode ran and how much host time it took,
+        and how many times each address was executed.
+
+        The CPU wraps its opcode handlers with wrap() only while a profiler is attached,
+        so nothing is measured, or paid for, otherwise.
+    """
+
+    def __init__(self, address_space=0x10000):
+        self.counts = [0] * 0x100           # Executions per opcode
+        self.times = [0.0] * 0x100          # Host seconds per opcode
+        self.hits = [0] * address_space     # Executions per program counter
+
+    def reset(self):
+        """ Forgets everything measured so far """
+
+        self.counts = [0] * 0x100
+        self.times = [0.0] * 0x100
+        self.hits = [0] * len(self.hits)
+
+    def wrap(self, opcode, handler):
+        """ Returns the handler of the instruction <opcode>, instrumented """
+
+        counts, times, hits = self.counts, self.times, self.hits
+        clock = time.perf_counter
+
+        def profiled(cpu):
+            pc = cpu.PC
+            start = clock()
+            handler(cpu)
+            times[opcode] += clock() - start
+            counts[opcode] += 1
+            hits[pc] += 1
+
+        return profiled
+
+    def opcodes(self):
+        """ Returns a list of (opcode, name, count, seconds) for every opcode that ran, slowest first """
+
+        rows = []
+        for opcode in range(0x100):
+            if self.counts[opcode]:
+                info = OPCODES[opcode]
+                name = "???" if info is None else info.mnemonic + " " + info.mode
+                rows.append((opcode, name, self.counts[opcode], self.times[opcode]))
+
+        rows.sort(key=lambda row: row[3], reverse=True)
+
+        return rows
+
+    def hot(self, limit=16):
+        """ Returns (address, count) of the <limit> most executed addresses """
+
+        used = [(pc, count) for pc, count in enumerate(self.hits) if count]
+        used.sort(key=lambda row: row[1], reverse=True)
+
+        return used[:limit]
+
+    def table(self, limit=16):
+        """ Returns the opcode costs and the hottest addresses as a printable table """
+
+        total = sum(self.times) or 1.0
+        lines = [
+            "+--------+------------------------+------------+------------+--------+",
+            "| Opcode | Instruction            |      Count |   Avg (ns) | Time % |",
+            "+--------+------------------------+------------+------------+--------+",
+        ]
+        for opcode, name, count, seconds in self.opcodes():
+            lines.append("|   ${:02X}  | {:<22} | {:>10} | {:>10.1f} | {:>5.1f}% |".format(
+                opcode, name, count, seconds / count * 1e9, seconds / total * 100))
+        lines.append("+--------+------------------------+------------+------------+--------+")
+
+        lines.append("| Hot PC | Count      |")
+        lines.append("+--------+------------+")
+        for pc, count in self.hot(limit):
+            lines.append("| ${:04X}  | {:>10} |".format(pc, count))
+        lines.append("+--------+------------+")
+
+        return "\n".join(lines)
+
+    def to_dict(self, limit=None):
+        """ Returns everything measured as a JSON friendly dict """
+
+        return {
+            "opcodes": [{"opcode": opcode, "name": name, "count": count, "seconds": seconds}
+                        for opcode, name, count, seconds in self.opcodes()],
+            "hot": [{"pc": pc, "count": count}
+                    for pc, count in self.hot(len(self.hits) if limit is None else limit)],
+        }
+
+    def save(self, path):
+        """ Writes everything measured to <path> as JSON """
+
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
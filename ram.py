@@ -11,19 +11,22 @@
 # +-----------------------------------------------------+
 
 from util import *
-from threading import Thread
+import os
 
 
-class RAM(Thread):
+class RAM:
 
     def __init__(self, data_width=8, address_space=2**16):
 
-        Thread.__init__(self)
-
         self.data_width = data_width
         self.address_space = address_space
+        self.mask = 2**data_width - 1       # Keeps written values inside the data width
+
+        self.heap = bytearray(address_space)    # Raw memory contents
+        self.view = memoryview(self.heap)       # Zero-copy window into the heap
 
-        self.heap = []
+        self.watched = bytearray(address_space) # Non-zero for bytes that someone keeps a decoded copy of
+        self.watchers = []                  # Called with (start, end) when watched bytes change
 
         self.init_heap()
 
@@ -54,42 +57,107 @@ class RAM(Thread):
         return state
 
     def init_heap(self):
-        """ Populates the heap array with zero values up to the length <self.address_space> """
+        """ Zeroes the whole heap in place, so the bus, the compiled code and every view keep pointing at it """
+
+        self.heap[:] = bytes(self.address_space)
+        self.invalidate(0, self.address_space)
+
+    def watch(self, start, end):
+        """ Marks the address range <start>:<end> as cached, so watchers hear about writes to it """
+
+        self.watched[start:end] = b'\x01' * (end - start)
+
+    def invalidate(self, start, end):
+        """ Tells every watcher that the address range <start>:<end> changed and stops watching it """
+
+        self.watched[start:end] = bytes(end - start)
 
-        self.heap = [0b00000000] * self.address_space
+        for watcher in self.watchers:
+            watcher(start, end)
+
+    def changed(self, start, end):
+        """ Invalidates the address range <start>:<end> if any byte in it is watched """
+
+        if self.watched.find(1, start, end) != -1:
+            self.invalidate(start, end)
 
     def push(self, data, sp):
         """ Writes <data> into address that <sp> is pointing to """
 
-        self.heap[sp] = data
+        self.heap[sp] = data & self.mask
 
-    def pop(self, sp):
-        """ Returns the value at the address that <sp> is pointing to and sets it to zero """
+        if self.watched[sp]:
+            self.invalidate(sp, sp + 1)
 
-        val = self.heap[sp]
-        self.heap[sp] = 0b00000000
+    def pop(self, sp):
+        """ Returns the value at the address that <sp> is pointing to, which stays in memory like on the real stack """
 
-        return val
+        return self.heap[sp]
 
     def write(self, addr, data):
         """ Writes <data> in the heap at the specified address <addr> """
 
-        self.heap[addr] = data
+        self.heap[addr] = data & self.mask
+
+        if self.watched[addr]:
+            self.invalidate(addr, addr + 1)
 
     def read(self, addr):
         """ Returns the value at the specified address <addr> """
 
         return self.heap[addr]
 
-    def dump_heap(self):
-        """ Creates a 'RAM' directory and writes a file 'heap.txt' with all of the memory addresses and contents """
+    def fill(self, addr, length, value=0b00000000):
+        """ Sets <length> bytes starting from <addr> to <value> """
+
+        self.heap[addr:addr + length] = bytes([value & self.mask]) * length
+        self.changed(addr, addr + length)
+
+    def copy(self, src, dst, length):
+        """ Copies <length> bytes from <src> to <dst>, the ranges may overlap """
+
+        self.heap[dst:dst + length] = self.view[src:src + length]
+        self.changed(dst, dst + length)
+
+    def load(self, addr, data):
+        """ Writes the bytes-like object <data> into the heap starting from <addr> """
+
+        if addr + len(data) > self.address_space:
+            raise IndexError("RAM load out of range")
+
+        self.heap[addr:addr + len(data)] = data
+        self.changed(addr, addr + len(data))
+
+    def compare(self, addr, data):
+        """ Returns True if the heap starting from <addr> matches the bytes-like object <data> """
+
+        return self.view[addr:addr + len(data)] == data
+
+    def snapshot(self):
+        """ Returns a copy of the whole memory image """
+
+        return bytes(self.heap)
+
+    def restore(self, image):
+        """ Replaces the whole memory image with the bytes-like object <image> """
+
+        if len(image) != self.address_space:
+            raise ValueError("Memory image doesn't match the size of RAM")
+
+        # Only pages that differ are copied and invalidated, so code decoded from the rest stays valid
+        image = memoryview(image)
+        for start in range(0, self.address_space, 0x100):
+            end = start + 0x100
+            if self.view[start:end] != image[start:end]:
+                self.heap[start:end] = image[start:end]
+                self.changed(start, end)
+
+    def dump_heap(self, path="RAM/heap.txt", start=0, end=None):
+        """ Writes the memory addresses and contents from <start> up to <end> to the text file <path> """
 
-        make_dir("RAM")
-        with open("RAM/heap.txt", 'w', encoding="utf-8") as f:
-            for addr, val in enumerate(self.heap):
-                if addr % 16 == 0:
-                    f.write("\n$" + hfmt(addr, 4) + ":")
-                f.write(" " + hfmt(val))
+        make_dir(os.path.dirname(path) or ".")
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write("\n".join(hexdump(self.heap, start, end)) + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0    Date: 18/10/2026    File: regress.py |
+# +-----------------------------------------------------+
+
+from cpu import CPU
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import time
+import sys
+import os
+
+ROM_DIR = "ROM"
+GOLDEN_PATH = os.path.join(ROM_DIR, "golden.json")
+
+# Every run stops at BRK or after this many cycles, whichever comes first
+CYCLE_BUDGET = 1000000
+
+# Seed of the random byte at $FE, so programs that use it still run the same every time
+SEED = 6502
+
+# Memory ranges kept in the golden files, as (start, end)
+RANGES = (
+    (0x0000, 0x0100),                       # Zero page
+    (0x0100, 0x0200),                       # Stack
+    (0x0200, 0x0600),                       # Screen
+)
+
+REGISTERS = ("AX", "X", "Y", "SP", "PC", "flags")
+
+# Ways of running a ROM, as (compiled blocks, idle loop skipping), that must all end in the same state
+ENGINES = {
+    "interp": (False, False),
+    "compiled": (True, False),
+    "idle": (False, True),
+    "compiled+idle": (True, True),
+}
+
+
+def run_rom(path, cycles=CYCLE_BUDGET, engine="interp"):
+    """ Runs the ROM at <path> on <engine> until BRK or <cycles> cycles and returns its final state as a dict """
+
+    blocks, idle = ENGINES[engine]
+
+    cpu = CPU(mode=0, rom_path=path, console=False)
+    cpu.rng.seed(SEED)
+    cpu.compile_blocks(blocks)
+    cpu.fast_forward(idle)
+
+    summary = cpu.run_for(cycles=cycles)
+
+    state = {
+        "reason": summary.reason,
+        "instructions": summary.instructions,
+        "cycles": summary.cycles,
+    }
+    for reg in REGISTERS:
+        state[reg] = getattr(cpu, reg)
+
+    state["memory"] = {"{:04x}".format(start): cpu.ram.heap[start:end].hex() for start, end in RANGES}
+
+    return state
+
+
+def compare(expected, actual):
+    """ Returns a list of lines describing how <actual> differs from <expected> """
+
+    problems = []
+
+    for key in ("reason", "instructions", "cycles") + REGISTERS:
+        if expected.get(key) != actual[key]:
+            problems.append("{}: expected {}, got {}".format(key, expected.get(key), actual[key]))
+
+    for start, data in actual["memory"].items():
+        golden = expected.get("memory", {}).get(start)
+        if golden == data:
+            continue
+        if golden is None or len(golden) != len(data):
+            problems.append("memory at ${}: missing from golden file".format(start))
+            continue
+
+        # Points at the first differing byte
+        first = next(i for i in range(0, len(data), 2) if golden[i:i + 2] != data[i:i + 2]) // 2
+        addr = int(start, 16) + first
+        problems.append("memory at ${:04x}: expected ${}, got ${}".format(
+            addr, golden[first * 2:first * 2 + 2], data[first * 2:first * 2 + 2]))
+
+    return problems
+
+
+def find_roms(names=()):
+    """ Returns the paths of the ROMs in ROM/, only those in <names> if given """
+
+    roms = sorted(name for name in os.listdir(ROM_DIR) if name.endswith(".bin"))
+    if names:
+        roms = [name for name in roms if name in names or os.path.splitext(name)[0] in names]
+
+    return [os.path.join(ROM_DIR, name) for name in roms]
+
+
+def differential(paths, cycles=CYCLE_BUDGET, jobs=None):
+    """ Runs every ROM in <paths> on every engine and reports where they end up differing from the interpreter """
+
+    runs = [(path, engine) for path in paths for engine in ENGINES]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        states = dict(zip(runs, pool.map(run_rom, *zip(*[(path, cycles, engine) for path, engine in runs]))))
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for path in paths:
+        reference = states[path, "interp"]
+        for engine in ENGINES:
+            if engine == "interp":
+                continue
+            problems = compare(reference, states[path, engine])
+            if problems:
+                print("{}: {} differs from interp".format(os.path.basename(path), engine))
+                for problem in problems:
+                    print("    " + problem)
+                failed += 1
+
+    print("{} ROMs on {} engines, {} differ, {:.2f}s".format(len(paths), len(ENGINES), failed, elapsed))
+
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs every ROM and compares the final state against the golden files")
+    parser.add_argument("roms", nargs="*", help="only run these ROMs")
+    parser.add_argument("--update", action="store_true", help="write the results as the new golden files")
+    parser.add_argument("--differential", action="store_true",
+                        help="compare every engine against the interpreter instead of the golden files")
+    parser.add_argument("--cycles", type=int, default=CYCLE_BUDGET, help="cycle budget of each run")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    paths = find_roms(args.roms)
+    if not paths:
+        print("No ROMs found")
+        return 2
+
+    if args.differential:
+        return differential(paths, args.cycles, args.jobs)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = dict(zip((os.path.basename(path) for path in paths),
+                           pool.map(run_rom, paths, [args.cycles] * len(paths))))
+    elapsed = time.perf_counter() - start
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+
+    if args.update:
+        golden.update(results)
+        with open(GOLDEN_PATH, 'w') as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+        print("Updated {} golden states in {:.2f}s".format(len(results), elapsed))
+        return 0
+
+    failed = missing = 0
+    for name, state in results.items():
+        if name not in golden:
+            print("{}: no golden state, run with --update".format(name))
+            missing += 1
+            continue
+
+        problems = compare(golden[name], state)
+        if problems:
+            print("{}: FAILED".format(name))
+            for problem in problems:
+                print("    " + problem)
+            failed += 1
+
+    print("{} ROMs, {} failed, {} missing, {:.2f}s".format(len(results), failed, missing, elapsed))
+
+    if failed:
+        return 1
+    if missing:
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
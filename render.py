@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026    File: render.py |
+# +-----------------------------------------------------+
+
+from colors import screen_palette
+from threading import Thread
+import numpy as np
+import struct
+import zlib
+import asyncio
+import time
+
+
+"""
+
+    -- Image encoding --
+
+"""
+
+
+def encode_ppm(image):
+    """ Returns the RGB array <image> of shape (height, width, 3) as a binary PPM file """
+
+    height, width, _ = image.shape
+    header = "P6\n{} {}\n255\n".format(width, height).encode("ascii")
+
+    return header + np.ascontiguousarray(image, dtype=np.uint8).tobytes()
+
+
+def encode_png(image):
+    """ Returns the RGB array <image> of shape (height, width, 3) as a PNG file """
+
+    height, width, _ = image.shape
+
+    # Every scanline starts with filter type 0, no filtering
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return b"".join((b"\x89PNG\r\n\x1a\n",
+                     chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                     chunk(b"IDAT", zlib.compress(rows.tobytes())),
+                     chunk(b"IEND", b"")))
+
+
+ENCODERS = {
+    "png": encode_png,
+    "ppm": encode_ppm,
+}
+
+
+class Renderer(Thread):
+    """
+        Renders the framebuffer to image files without a window or pygame.
+
+        Started as a thread it looks at the screen <fps> times a second and saves
+        every <every>-th changed frame to <path>, which may contain a {} for the frame number.
+    """
+
+    def __init__(self, cpu, scale=10, palette=None, path="screen.png", every=16, fps=16):
+        Thread.__init__(self, daemon=True)
+
+        self.cpu = cpu
+        self.scale = scale
+        self.path = path
+        self.every = every
+        self.fps = fps
+
+        self.frames = 0                     # Changed frames seen so far
+        self.version = None                 # Framebuffer version of the last frame seen
+
+        # 256 entry lookup table from pixel value to RGB, repeating the palette if it's shorter
+        if palette is None:
+            palette = screen_palette
+        palette = np.array(palette, dtype=np.uint8).reshape(-1, 3)
+        self.palette = palette[np.arange(256) % len(palette)]
+
+    def frame(self):
+        """ Returns the current screen as a scaled RGB array of shape (height, width, 3) """
+
+        framebuffer = self.cpu.framebuffer
+        pixels = np.frombuffer(framebuffer.view(), dtype=np.uint8).reshape(framebuffer.height, framebuffer.width)
+
+        image = self.palette[pixels]
+        if self.scale > 1:
+            image = image.repeat(self.scale, axis=0).repeat(self.scale, axis=1)
+
+        return image
+
+    def save(self, path=None):
+        """ Writes the current screen to <path>, as PPM if it ends in .ppm and PNG otherwise """
+
+        if path is None:
+            path = self.path.format(self.frames)
+
+        encode = ENCODERS.get(path.rsplit(".", 1)[-1].lower(), encode_png)
+        with open(path, 'wb') as f:
+            f.write(encode(self.frame()))
+
+        return path
+
+    def update(self):
+        """ Counts a frame if the screen changed and saves it when it's due, returns True if saved """
+
+        version = self.cpu.framebuffer.version
+        if version == self.version:
+            return False
+
+        self.version = version
+        self.frames += 1
+
+        if self.every and self.frames % self.every == 0:
+            self.save()
+            return True
+
+        return False
+
+    def run(self):
+        while True:
+            self.update()
+            time.sleep(1 / self.fps)
+
+    async def serve(self):
+        """ Same as run(), as a coroutine for a Machine """
+
+        while True:
+            self.update()
+            await asyncio.sleep(1 / self.fps)
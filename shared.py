@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026    File: shared.py |
+# +-----------------------------------------------------+
+
+from threading import Thread
+from multiprocessing import Process, shared_memory
+from types import SimpleNamespace
+import numpy as np
+import asyncio
+import struct
+import time
+import sys
+
+# Shared block layout, followed by the pixels row by row
+#
+# sequence, width, height
+#
+# The sequence is odd while the publisher is writing the pixels and goes up by 2 per frame
+HEADER = struct.Struct("<QHH")
+
+
+class SharedScreen:
+    """
+        Framebuffer copy in a multiprocessing.shared_memory block, so another process can draw it.
+
+        The CPU process creates the block and publish()es changed frames into it. A renderer process
+        attaches to it by <name> and reads it through the same interface as the Framebuffer device
+        (width, height, version, view() and take_dirty()), so PPU and Renderer work on it unchanged.
+    """
+
+    def __init__(self, name=None, width=32, height=32, create=True):
+        if create:
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + width * height)
+            HEADER.pack_into(self.memory.buf, 0, 0, width, height)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            _, width, height = HEADER.unpack_from(self.memory.buf, 0)
+
+        self.name = self.memory.name
+        self.owner = create
+        self.width = width
+        self.height = height
+
+        self.sequence = self.memory.buf[:8].cast("Q")
+        self.pixels = self.memory.buf[HEADER.size:HEADER.size + width * height]
+
+        self.published = None               # Framebuffer version of the last published frame
+        self.frame = bytearray(width * height)              # Last frame read by the renderer side
+        self.last = -1                      # Sequence number of <frame>
+        self.dirty = bytearray(b"\x01" * height)            # Rows changed in <frame> since the last take_dirty
+
+    # - Writer side, in the CPU process -
+
+    def publish(self, framebuffer):
+        """ Copies the screen of the <framebuffer> device over if it changed, returns True if it did """
+
+        if framebuffer.version == self.published:
+            return False
+
+        self.published = framebuffer.version
+
+        self.sequence[0] += 1
+        self.pixels[:] = framebuffer.view()
+        self.sequence[0] += 1
+
+        return True
+
+    # - Reader side, in the renderer process -
+
+    def read(self):
+        """ Takes a consistent copy of the latest frame, returns True if it's a new one """
+
+        while True:
+            sequence = self.sequence[0]
+            if sequence == self.last:
+                return False
+
+            # Retries until no frame was published while copying
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            frame = bytes(self.pixels)
+            if self.sequence[0] == sequence:
+                break
+
+        # Marks the rows that differ from the previous frame
+        old = np.frombuffer(self.frame, dtype=np.uint8).reshape(self.height, self.width)
+        new = np.frombuffer(frame, dtype=np.uint8).reshape(self.height, self.width)
+        for row in np.flatnonzero((old != new).any(axis=1)):
+            self.dirty[row] = 1
+
+        self.frame[:] = frame
+        self.last = sequence
+
+        return True
+
+    @property
+    def version(self):
+        """ Number of the latest frame, reading it refreshes the copy view() returns """
+
+        self.read()
+
+        return self.last >> 1
+
+    def view(self):
+        """ Returns the last frame read """
+
+        return memoryview(self.frame)
+
+    def take_dirty(self):
+        """ Returns the indices of the rows changed since the last call and clears them """
+
+        dirty, self.dirty = self.dirty, bytearray(self.height)
+
+        return [row for row in range(self.height) if dirty[row]]
+
+    def close(self):
+        """ Detaches from the block, and frees it if this side created it """
+
+        self.sequence.release()
+        self.pixels.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class Publisher(Thread):
+    """
+        Copies the CPU's screen into a SharedScreen <fps> times a second, whenever it changed.
+
+        A copy is a single 1 KiB slice assignment, so the CPU never waits on the renderer.
+        close() stops it, stops the renderer <process> if it has one and frees the block.
+    """
+
+    def __init__(self, cpu, screen=None, fps=60, process=None):
+        Thread.__init__(self, daemon=True)
+
+        self.cpu = cpu
+        self.fps = fps
+        self.screen = SharedScreen(width=cpu.framebuffer.width, height=cpu.framebuffer.height) \
+            if screen is None else screen
+        self.process = process              # Renderer process drawing the screen, if any
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.screen.publish(self.cpu.framebuffer)
+            time.sleep(1 / self.fps)
+
+    async def serve(self):
+        """ Same as run(), as a coroutine for a Machine """
+
+        while self.running:
+            self.screen.publish(self.cpu.framebuffer)
+            await asyncio.sleep(1 / self.fps)
+
+    def close(self):
+        """ Stops publishing, stops and joins the renderer process, then closes and unlinks the block """
+
+        self.running = False
+        if self.is_alive():
+            self.join()
+
+        # The renderer draws until it's killed
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+        self.screen.close()
+
+
+def display(name, window=True, **kwargs):
+    """
+        Renderer process entry point, draws the SharedScreen called <name> until killed.
+        Opens a PPU window if <window> is true and saves frames with a Renderer otherwise,
+        passing <kwargs> on to either.
+    """
+
+    screen = SharedScreen(name, create=False)
+
+    # Both only ever look at cpu.framebuffer
+    source = SimpleNamespace(framebuffer=screen)
+
+    if window:
+        from ppu import PPU
+        PPU(source, **kwargs).run()
+    else:
+        from render import Renderer
+        Renderer(source, **kwargs).run()
+
+
+def start_display(cpu, window=None, fps=60, **kwargs):
+    """
+        Starts drawing the screen of <cpu> in a separate process and returns the (Publisher, Process) pair.
+        <window> defaults to a PPU window on Windows and to saving frames elsewhere, like main.py does.
+        The Publisher isn't started, so it can be started as a thread or added to a Machine.
+        Publisher.close() shuts the process down and frees the shared memory.
+    """
+
+    if window is None:
+        window = sys.platform == "win32"
+
+    publisher = Publisher(cpu, fps=fps)
+
+    process = Process(target=display, args=(publisher.screen.name, window), kwargs=kwargs, daemon=True)
+    process.start()
+    publisher.process = process
+
+    return publisher, process
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2018 Andrija Jovanovic
+#
+# +-----------------------------------------------------+
+# |      A MOS Technology 6502 Processor Emulator       |
+# |       written in python by Andrija Jovanovic        |
+# |                                                     |
+# | Version 1.0     Date: 18/10/2026    File: tracer.py |
+# +-----------------------------------------------------+
+
+from opcodes import OPCODES, LENGTHS
+from disassembler import format_instruction, format_bytes, format_flags
+import numpy as np
+import argparse
+import struct
+import sys
+import os
+
+# One trace record, the state right before an instruction runs
+#
+# pc, opcode, operand, AX, X, Y, SP, flags, cycle count
+RECORD = np.dtype([
+    ("pc", "<u2"),
+    ("opcode", "u1"),
+    ("operand", "<u2"),
+    ("a", "u1"),
+    ("x", "u1"),
+    ("y", "u1"),
+    ("sp", "<u2"),
+    ("flags", "u1"),
+    ("cycle", "<u8"),
+])
+RECORD_STRUCT = struct.Struct("<HBHBBBHBQ")
+
+assert RECORD.itemsize == RECORD_STRUCT.size
+
+
+class Tracer:
+    """
+        Records every executed instruction as a fixed width binary record.
+
+        Records are kept in memory by default, appended to the file at <path> if given,
+        or only the last <capacity> of them are kept if that is given instead.
+        The CPU wraps its opcode handlers with wrap() only while a tracer is attached.
+    """
+
+    def __init__(self, path=None, capacity=None, chunk=65536):
+        if path is not None and capacity is not None:
+            raise ValueError("A trace can either go to a file or to a ring buffer, not both")
+
+        self.path = path
+        self.capacity = capacity
+        self.count = 0                      # Records written in total
+
+        # Records are packed into <buffer> and moved out whenever it fills up
+        size = capacity if capacity is not None else chunk
+        self.buffer = bytearray(size * RECORD.itemsize)
+        self.position = 0                   # Byte offset of the next record in <buffer>
+
+        self.chunks = []                    # Full buffers, when kept in memory
+        self.file = open(path, 'wb') if path is not None else None
+
+    def __len__(self):
+        if self.capacity is not None:
+            return min(self.count, self.capacity)
+
+        return self.count
+
+    def wrap(self, opcode, handler):
+        """ Returns the handler of the instruction <opcode>, recording itself before it runs """
+
+        record = self.record
+        info = OPCODES[opcode]
+        length = 1 if info is None else LENGTHS[info.mode]
+
+        def traced(cpu):
+            pc = cpu.PC
+            heap = cpu.ram.heap
+
+            # Operand bytes, little endian, wrapping at $FFFF like the handlers do
+            if length == 3:
+                operand = heap[(pc + 1) & 0xFFFF] | heap[(pc + 2) & 0xFFFF] << 8
+            elif length == 2:
+                operand = heap[(pc + 1) & 0xFFFF]
+            else:
+                operand = 0
+
+            record(pc, opcode, operand, cpu.AX, cpu.X, cpu.Y, cpu.SP & 0xFFFF, cpu.flags, cpu.cycles)
+            handler(cpu)
+
+        return traced
+
+    def record(self, *fields):
+        """ Appends a record made of <fields>, in the order of RECORD """
+
+        RECORD_STRUCT.pack_into(self.buffer, self.position, *fields)
+        self.position += RECORD.itemsize
+        self.count += 1
+
+        if self.position == len(self.buffer):
+            self.spill()
+
+    def spill(self):
+        """ Moves the full buffer out of the way """
+
+        if self.capacity is None:
+            if self.file is not None:
+                self.file.write(self.buffer)
+            else:
+                self.chunks.append(bytes(self.buffer))
+
+        # Ring buffers just start over, overwriting the oldest records
+        self.position = 0
+
+    def flush(self):
+        """ Writes the records so far to the file, if there is one """
+
+        if self.file is not None:
+            self.file.write(self.buffer[:self.position])
+            self.file.flush()
+            self.position = 0
+
+    def close(self):
+        """ Flushes and closes the file, if there is one """
+
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def records(self):
+        """ Returns the records as a structured array, oldest first, memory mapped if they are in a file """
+
+        if self.path is not None:
+            if self.file is not None:
+                self.flush()
+            return load(self.path)
+
+        if self.capacity is not None:
+            data = self.buffer[:self.position]
+            if self.count > self.capacity:
+                data = self.buffer[self.position:] + data
+            return np.frombuffer(bytes(data), dtype=RECORD)
+
+        return np.frombuffer(b"".join(self.chunks) + bytes(self.buffer[:self.position]), dtype=RECORD)
+
+
+def load(path):
+    """ Returns the trace in the file at <path> as a read only, memory mapped structured array """
+
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=RECORD)
+
+    return np.memmap(path, dtype=RECORD, mode='r')
+
+
+"""
+
+    -- Offline decoding --
+
+"""
+
+def format_record(record):
+    """ Returns a trace record as a line of text """
+
+    pc, opcode, operand = int(record["pc"]), int(record["opcode"]), int(record["operand"])
+
+    info = OPCODES[opcode]
+    length = 1 if info is None else LENGTHS[info.mode]
+    raw = format_bytes(opcode, operand, length)
+
+    return "${:04X}  {:<8}  {:<14}  A={:02X} X={:02X} Y={:02X} SP={:04X} P={}  CYC={}".format(
+        pc, raw, format_instruction(pc, opcode, operand),
+        int(record["a"]), int(record["x"]), int(record["y"]), int(record["sp"]),
+        format_flags(int(record["flags"])), int(record["cycle"]))
+
+
+def decode(records, start=0, limit=None):
+    """ Yields the trace <records> as lines of text, from <start> and up to <limit> of them """
+
+    end = len(records) if limit is None else min(len(records), start + limit)
+
+    for i in range(start, end):
+        yield format_record(records[i])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prints a binary trace as text")
+    parser.add_argument("path", help="trace file")
+    parser.add_argument("--start", type=int, default=0, help="first record to print")
+    parser.add_argument("--limit", type=int, default=None, help="number of records to print")
+    args = parser.parse_args(argv)
+
+    for line in decode(load(args.path), args.start, args.limit):
+        print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
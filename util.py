@@ -44,12 +44,24 @@ def bfmt(num, size=8):
 def hfmt(num, size=0):
     """ Returns the printable string version of a hex number <num> that's length <size> """
     if size == 0:
-        size = digit_count(num, 16) + digit_count(num, 16) % 2
+        # Enough whole bytes for the number, without going through floating point logarithms
+        size = max(1, (num.bit_length() + 7) // 8) * 2
 
     length = '0' + str(size) + 'x'
     return format(num, length)
 
 
+def hexdump(data, start=0, end=None, width=16):
+    """ Returns the bytes of <data> from <start> up to <end> as lines of <width> hex bytes, each after its address """
+
+    if end is None or end > len(data):
+        end = len(data)
+
+    # One bulk conversion per line instead of one format call per byte
+    return ["${:04X}: {}".format(addr, bytes(data[addr:min(addr + width, end)]).hex(" ").upper())
+            for addr in range(start, end, width)]
+
+
 def hcat(*nums):
     """ Concatenates hex values together and returns it as an integer """
 
@@ -67,20 +79,60 @@ def clear():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
-#      f-tion ref | freq. in Hz
-def freq(function, frequency=1.0):
-    """ Runs <function> at the given <frequency> """
+class Throttle:
+    """
+        Paces work measured in cycles to <frequency> Hz.
+
+        Work runs in batches of <batch> cycles, each sized to take <time_slice> seconds
+        at the target rate. After every batch the throttle sleeps until the absolute
+        deadline for all cycles run so far, so oversleeping on one batch is made up on
+        the next instead of adding up. A <frequency> of 0 runs unthrottled.
+    """
+
+    def __init__(self, frequency, time_slice=0.01, max_lag=0.25):
+        self.frequency = frequency          # Target rate in cycles per second
+        self.time_slice = time_slice        # Host time a batch should take, in seconds
+        self.max_lag = max_lag              # Backlog in seconds after which the schedule starts over
+
+        # Cycles per batch
+        if frequency:
+            self.batch = max(1, int(frequency * time_slice))
+        else:
+            self.batch = 10000
+
+        self.start = None                   # Host time the schedule started at
+        self.cycles = 0                     # Cycles run since <start>
+
+    def reset(self):
+        """ Starts the schedule over from now """
+
+        self.start = time.perf_counter()
+        self.cycles = 0
+
+    def delay(self, cycles):
+        """ Accounts for <cycles> of finished work and returns how long to wait for the schedule to catch up """
+
+        if not self.frequency:
+            return 0.0
+
+        if self.start is None:
+            self.reset()
+
+        self.cycles += cycles
+        delay = self.start + self.cycles / self.frequency - time.perf_counter()
+
+        if delay < -self.max_lag:
+            # The host can't keep up, so drop the backlog instead of running flat out to catch up
+            self.reset()
+
+        return max(delay, 0.0)
+
+    def pace(self, cycles):
+        """ Accounts for <cycles> of finished work and sleeps until the schedule catches up with it """
 
-    while True:
-        start = time.time()
-        function()
-        while True:
-            current_time = time.time()
-            try:
-                if current_time - start >= 1.0/float(frequency):
-                    break
-            except ZeroDivisionError:
-                break
+        delay = self.delay(cycles)
+        if delay:
+            time.sleep(delay)
 
 
 def make_dir(directory):
@@ -179,10 +231,12 @@ def str_to_bin(string):
     return int(string, 2)
 
 
-def is_immediate(addr):
-    """ Evaluates whether or not an addressing is immediate """
+def evict(cache, start, end, reach=2):
+    """ Drops the entries of <cache>, keyed by address, that can overlap <start>:<end>, entries spanning <reach> more bytes """
 
-    if 0x0600 < addr < 0x0800:
-        return True
+    if end - start > len(cache):
+        for addr in [addr for addr in cache if start - reach <= addr < end]:
+            del cache[addr]
     else:
-        return False
+        for addr in range(start - reach, end):
+            cache.pop(addr, None)